@@ -0,0 +1,71 @@
+"""
+Wiring shared by the GUI (app.main) and the headless daemon (app.headless).
+Must not import PySide6.
+"""
+from typing import Dict
+
+from app.core.actions import ActionEvent, ActionKind
+from app.core.controller import Binding
+from app.services.registry import SpotifyServiceRegistry
+from app.services.spotify_client import SpotifyService
+
+
+CLIENT_ID = "4075de68534e4c0c92d89a9c9c21d29f"
+REDIRECT_URI = "http://127.0.0.1:8888/callback"
+SCOPE = "user-read-playback-state user-modify-playback-state playlist-read-private user-library-read user-read-recently-played"
+
+# Per module log levels on top of the global one
+LOG_LEVELS = {
+    "urllib3": "WARNING",
+    "spotipy": "WARNING",
+}
+
+# One service per account / zone, "" is the default account.
+# Add more names here (e.g. "bar", "terrace") to control several zones.
+# Zones are logged in one after another; on each login page use
+# "Not you?" to sign in as that zone's Spotify user.
+ACCOUNTS = ("",)
+
+
+def build_accounts() -> SpotifyServiceRegistry:
+    accounts = SpotifyServiceRegistry()
+    for account in ACCOUNTS:
+        accounts.add(account, SpotifyService(
+            client_id=CLIENT_ID,
+            redirect_uri=REDIRECT_URI,
+            scope=SCOPE,
+            account=account,
+            # with several zones, always show the login page so each zone can pick its own user
+            show_dialog=len(ACCOUNTS) > 1,
+        ))
+    return accounts
+
+
+def default_bindings() -> Dict[int, Binding]:
+    # This will be done from a settings / binding window later
+    return {
+        1: Binding(type="playlist", uri="spotify:playlist:4zqPelMTbUfaSpAKWHux7M"),
+        2: Binding(type="track", uri="spotify:track:6woV8uWxn7rcLZxJKYruS1"),
+    }
+
+
+def serial_mapping() -> Dict[ActionEvent, str]:
+    # These should be redefined later from bindings
+    return {
+        ActionEvent(ActionKind.SLOT, 1): "SLOT_1",
+        ActionEvent(ActionKind.SLOT, 2): "SLOT_2",
+        ActionEvent(ActionKind.PLAY_PAUSE): "PLAY_PAUSE",
+        ActionEvent(ActionKind.NEXT): "NEXT",
+        ActionEvent(ActionKind.PREV): "PREV",
+    }
+
+
+def hotkey_mapping() -> Dict[ActionEvent, str]:
+    # These should be redefined later from bindings
+    return {
+        ActionEvent(ActionKind.SLOT, 1): "<ctrl>+<alt>+<f1>",
+        ActionEvent(ActionKind.SLOT, 2): "<ctrl>+<alt>+<f2>",
+        ActionEvent(ActionKind.PLAY_PAUSE): "<ctrl>+<alt>+p",
+        ActionEvent(ActionKind.NEXT): "<ctrl>+<alt>+<right>",
+        ActionEvent(ActionKind.PREV): "<ctrl>+<alt>+<left>",
+    }
@@ -0,0 +1,181 @@
+"""
+Logging setup. Modules only do `log = logging.getLogger(__name__)`; the
+entry points call setup_logging() once.
+
+Records are put on a bounded queue by the calling thread (input threads,
+the GUI thread ...) and written by a background listener, so logging
+never waits for the disk or the console. When the queue is full new
+records are dropped and counted instead of blocking; the count is logged
+as soon as there is room again, and at shutdown.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config.paths import get_cache_dir
+
+
+# attributes every LogRecord has, anything else came in through extra={...}
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _extra(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with extra={...} fields as top level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+            **_extra(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last N records in memory for a debug view."""
+
+    def __init__(self, capacity: int = 500) -> None:
+        super().__init__()
+        self._records: deque = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._records.append({
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_extra(record),
+        })
+
+    def records(self, limit: Optional[int] = None) -> List[dict]:
+        records = list(self._records)
+        return records[-limit:] if limit else records
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, q: queue.Queue) -> None:
+        super().__init__(q)
+        self.dropped = 0
+        self._reported = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped > self._reported:
+            self._report()
+
+    def _report(self) -> None:
+        dropped, self._reported = self.dropped - self._reported, self.dropped
+        record = logging.makeLogRecord({
+            "name": __name__,
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": "%d log records dropped, the log queue was full (%d in total)",
+            "args": (dropped, self.dropped),
+            "dropped": dropped,
+        })
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._reported -= dropped  # next time
+
+
+@dataclass
+class LoggingHandle:
+    listener: logging.handlers.QueueListener
+    ring: RingBufferHandler
+    queue_handler: _DroppingQueueHandler
+
+    @property
+    def dropped(self) -> int:
+        return self.queue_handler.dropped
+
+    def stop(self) -> None:
+        """Flushes what is queued and stops the writer thread."""
+        if self.dropped:
+            logging.getLogger(__name__).warning("%d log records were dropped this run", self.dropped)
+        self.listener.stop()
+
+
+_handle: Optional[LoggingHandle] = None
+_lock = threading.Lock()
+
+
+def setup_logging(
+    level: str = "INFO",
+    levels: Optional[Dict[str, str]] = None,
+    log_file: Optional[Path] = None,
+    max_bytes: int = 1024 * 1024,
+    backups: int = 3,
+    console: bool = True,
+    ring_size: int = 500,
+    queue_size: int = 10000,
+) -> LoggingHandle:
+    """
+    levels: per module levels, e.g. {"app.ui.image_loader": "WARNING"}.
+    log_file: rotating JSON lines file, defaults to logs/app.log in the cache dir.
+    """
+    global _handle
+    with _lock:
+        if _handle:
+            return _handle
+
+        ring = RingBufferHandler(ring_size)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file or get_cache_dir("logs") / "app.log",
+            maxBytes=max_bytes,
+            backupCount=backups,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers: List[logging.Handler] = [file_handler, ring]
+        if console:
+            stream = logging.StreamHandler()
+            stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+            handlers.append(stream)
+
+        q: queue.Queue = queue.Queue(maxsize=queue_size)
+        queue_handler = _DroppingQueueHandler(q)
+        listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+
+        root = logging.getLogger()
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        root.addHandler(queue_handler)
+        root.setLevel(level.upper())
+        for name, module_level in (levels or {}).items():
+            logging.getLogger(name).setLevel(module_level.upper())
+
+        listener.start()
+        _handle = LoggingHandle(listener, ring, queue_handler)
+        return _handle
+
+
+def recent_logs(limit: Optional[int] = None) -> List[dict]:
+    """Recent records from the ring buffer, empty if logging is not set up."""
+    return _handle.ring.records(limit) if _handle else []
+
+
+def dropped_logs() -> int:
+    """Records dropped because the log queue was full, since setup_logging()."""
+    return _handle.dropped if _handle else 0
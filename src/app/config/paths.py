@@ -0,0 +1,15 @@
+from pathlib import Path
+
+from platformdirs import user_cache_dir
+
+
+APP_NAME = "MacroKeyboardSpotifyInterface"
+
+
+def get_cache_dir(*parts: str) -> Path:
+    """
+    Returns (and creates) a directory under the user cache dir of the app.
+    """
+    path = Path(user_cache_dir(APP_NAME), *parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
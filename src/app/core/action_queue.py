@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .actions import ActionEvent, ActionKind
+from app.config.paths import get_cache_dir
+
+
+@dataclass(frozen=True)
+class QueuedAction:
+    action: ActionEvent
+    queued_at: float
+
+
+class OfflineActionQueue:
+    """
+    Holds actions while Spotify is unreachable and replays them, collapsed per account
+    and dropped after max_age. Each account backs off on its own.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_size: int = 32,
+        max_age: float = 3600,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        compact_after: int = 500,
+    ) -> None:
+        self._path = Path(path) if path else get_cache_dir() / "action_queue.jsonl"
+        self._max_size = max_size
+        self._max_age = max_age
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._compact_after = compact_after
+
+        self._items: List[QueuedAction] = []
+        self._lines = 0
+        self._cond = threading.Condition()
+        self._wake = False
+        self._in_flight: Optional[QueuedAction] = None  # never collapsed away while it replays
+        self._delay: Dict[Optional[str], float] = {}  # account -> current backoff
+        self._retry_at: Dict[Optional[str], float] = {}  # account -> monotonic time of the next try
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._load()
+
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+
+    def pending(self, account: Optional[str]) -> int:
+        """Queued actions for one account."""
+        return sum(1 for q in self._items if q.action.account == account)
+
+
+    def oldest_age(self) -> Optional[float]:
+        """Seconds since the oldest queued action was pressed, None if empty."""
+        items = self._items
+        return time.time() - items[0].queued_at if items else None
+
+
+    def stats(self) -> Tuple[int, Optional[float]]:
+        return self.depth, self.oldest_age()
+
+
+    def push(self, action: ActionEvent, queued_at: Optional[float] = None) -> None:
+        with self._cond:
+            items = self._items
+            entry = QueuedAction(action, queued_at or time.time())
+            # the entry being replayed is out of reach, it runs no matter what
+            same = [i for i, q in enumerate(items) if q.action.account == action.account and q is not self._in_flight]
+
+            if action.kind == ActionKind.SLOT:
+                items = [q for i, q in enumerate(items) if i not in same]
+                items.append(entry)
+            elif action.kind == ActionKind.PLAY_PAUSE and same and items[same[-1]].action.kind == ActionKind.PLAY_PAUSE:
+                del items[same[-1]]  # toggle + toggle = nothing
+            else:
+                items.append(entry)
+
+            self._items = items[-self._max_size:]
+            self._persist()
+            self._cond.notify_all()
+
+
+    def wake(self) -> None:
+        """
+        Retry every account right away, e.g. when Spotify answers again.
+        """
+        with self._cond:
+            self._wake = True
+            self._cond.notify_all()
+
+
+    def start(
+        self,
+        replay: Callable[[ActionEvent], None],
+        is_unavailable: Callable[[Exception], bool],
+        on_error: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """
+        replay runs one action and raises if it failed. Failures for which
+        is_unavailable is true are retried with backoff, others are dropped.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(replay, is_unavailable, on_error), name="action-queue", daemon=True
+        )
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+    def _run(self, replay, is_unavailable, on_error) -> None:
+        while True:
+            head = self._next()
+            if head is None:
+                return
+            account = head.action.account
+
+            try:
+                replay(head.action)
+            except Exception as e:
+                if is_unavailable(e):
+                    with self._cond:
+                        self._in_flight = None
+                        delay = self._delay.get(account, self._base_delay)
+                        self._retry_at[account] = time.monotonic() + delay
+                        self._delay[account] = min(delay * 2, self._max_delay)
+                    continue
+                if on_error:
+                    on_error(f"Dropped queued {head.action.kind.value}: {e}")
+
+            with self._cond:
+                self._in_flight = None
+                self._delay.pop(account, None)
+                self._retry_at.pop(account, None)
+                self._remove(head)
+
+
+    def _next(self) -> Optional[QueuedAction]:
+        """
+        Waits for the oldest entry of an account that is not backing off and
+        marks it in flight. None once stopped.
+        """
+        with self._cond:
+            while not self._stop.is_set():
+                if self._wake:
+                    # consumed here, so a wake that came in during a replay still counts
+                    self._wake = False
+                    self._retry_at.clear()
+                    self._delay.clear()
+
+                expired = [q for q in self._items if time.time() - q.queued_at > self._max_age]
+                for q in expired:
+                    self._remove(q)
+
+                now = time.monotonic()
+                for q in self._items:
+                    if self._retry_at.get(q.action.account, 0) <= now:
+                        self._in_flight = q
+                        return q
+
+                if not self._items:
+                    self._cond.wait()
+                else:
+                    waits = [self._retry_at[q.action.account] for q in self._items if q.action.account in self._retry_at]
+                    self._cond.wait(timeout=max(0.0, min(waits) - now))
+            return None
+
+
+    def _remove(self, entry: QueuedAction) -> None:
+        # by identity, a push may have collapsed or truncated it meanwhile
+        for i, q in enumerate(self._items):
+            if q is entry:
+                del self._items[i]
+                self._persist()
+                return
+
+
+    def _persist(self) -> None:
+        line = json.dumps([
+            [q.action.kind.value, q.action.slot_id, q.action.account, round(q.queued_at, 3)]
+            for q in self._items
+        ], separators=(",", ":"))
+
+        if self._lines >= self._compact_after:
+            tmp = self._path.with_suffix(".tmp")
+            tmp.write_text(line + "\n")
+            tmp.replace(self._path)
+            self._lines = 1
+            return
+
+        with open(self._path, "a") as f:
+            f.write(line + "\n")
+        self._lines += 1
+
+
+    def _load(self) -> None:
+        try:
+            lines = self._path.read_text().splitlines()
+        except FileNotFoundError:
+            return
+
+        self._lines = len(lines)
+        for line in reversed(lines):
+            try:
+                rows = json.loads(line)
+                self._items = [
+                    QueuedAction(ActionEvent(ActionKind(kind), slot_id, account), queued_at)
+                    for kind, slot_id, account, queued_at in rows
+                ]
+                return
+            except (ValueError, TypeError):
+                continue  # torn write at the end of the file
@@ -12,3 +12,4 @@ class ActionKind(str, Enum):
 class ActionEvent:
     kind: ActionKind
     slot_id: Optional[int] = None
+    account: Optional[str] = None  # None = default account, "*" = all accounts
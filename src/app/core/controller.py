@@ -1,18 +1,30 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Callable, Dict, Optional
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Optional, Tuple
 
 from .actions import ActionEvent, ActionKind
+from .action_queue import OfflineActionQueue
+from .playback_events import DeviceChanged, PlaybackEvent, PlaybackEventBus, PlaybackSnapshot, TrackChanged
+from app.services.metadata_cache import MetadataCache
+from app.services.prewarm import SlotPrewarmer
+from app.services.registry import ALL_ACCOUNTS, AccountsError, SpotifyServiceRegistry
+from app.services.spotify_client import is_unavailable_error
+
+log = logging.getLogger(__name__)
 
 StatusFn = Callable[[str], None]   # UI kan sætte en status label
 ErrorFn  = Callable[[str], None]
 CoverUrlFn = Callable[[str], None]  # UI kan sætte cover via URL
+SlotLabelsFn = Callable[[Dict[int, Tuple[str, str]]], None]  # slot_id -> (label, tooltip)
 
 @dataclass
 class Binding:
-    type: str  # "track" / "playlist"
+    type: str  # "track" / "playlist" / "album" / "uris"
     uri: str
     name: str = "" # Optional name for display purposes
+    account: Optional[str] = None  # None = default account, "*" = all accounts
 
 
 
@@ -24,82 +36,259 @@ class AppController:
         set_status: StatusFn,
         set_error: ErrorFn,
         set_cover_url: CoverUrlFn,
+        accounts: Optional[SpotifyServiceRegistry] = None,
+        metadata: Optional[MetadataCache] = None,
+        set_slot_labels: Optional[SlotLabelsFn] = None,
+        action_queue: Optional[OfflineActionQueue] = None,
+        prewarmer: Optional[SlotPrewarmer] = None,
     ) -> None:
         self.spotify = spotify_service
+        if accounts is None:
+            accounts = SpotifyServiceRegistry()
+            accounts.add("", spotify_service)
+        self.accounts = accounts
         self.control_bindings = control_bindings
         self.set_status = set_status
         self.set_error = set_error
         self.set_cover_url = set_cover_url
+        self.metadata = metadata
+        self.set_slot_labels = set_slot_labels
+        self.action_queue = action_queue
+        self.prewarmer = prewarmer
         self._last_cover_url = ""
+        self._last_song_uri = ""
+        self._poll_ok = False
+        self._warm_lock = threading.Lock()
+
+        # every consumer of playback changes hangs off this, fed by refresh_playback
+        self.events = PlaybackEventBus()
+        self.events.subscribe_callback(self._on_track_changed, kinds={TrackChanged})
+        self.events.subscribe_callback(self._on_device_changed, kinds={DeviceChanged})
 
 
     def refresh_playback(self) -> None:
+        """
+        The one playback poll. Publishes the snapshot on self.events, which
+        turns it into change events for the UI and every other subscriber.
+        """
         try:
-            # change get_cover_url to get_song_info and then make get_cover_url have song as argument.
-            song = self.spotify.get_song_info()
-            if song:
-                self.set_status(f"{song['name']}  -  {song['artists'][0]['name']}")
-                url = self.get_cover_url(song)
-                if url and url.startswith("http") and url != self._last_cover_url:
-                    self.set_cover_url(url)
-                    self._last_cover_url = url
+            # on the default account's worker, so it never overlaps a key press
+            [playback] = self.accounts.run(None, lambda svc: svc.get_playback()).values()
+            if not self._poll_ok:
+                self._poll_ok = True
+                self._wake_queue()  # Spotify answers again, try the queue now
+
+            song = (playback or {}).get("item")
+            if song and self.metadata and song.get("uri") != self._last_song_uri:
+                self.metadata.put_item(song)  # free metadata, we already have it
+            self._last_song_uri = (song or {}).get("uri", "")
+
+            snapshot = PlaybackSnapshot.from_playback(playback)
+            self.events.publish(snapshot)
+            if snapshot.track_uri:
+                self.set_status(self._status_text(snapshot))
         except Exception as e:
+            self._poll_ok = False
             self.set_error(f"Error refreshing playback: {e}")
 
 
+    def _wake_queue(self) -> None:
+        # only on transitions, a wake resets the queue's backoff
+        if self.action_queue and self.action_queue.depth:
+            self.action_queue.wake()
+
+
+    def _on_device_changed(self, event: PlaybackEvent) -> None:
+        if event.snapshot.device_id:
+            self._wake_queue()  # a device appeared, queued presses can play now
+
+
+    def _on_track_changed(self, event: PlaybackEvent) -> None:
+        url = event.snapshot.cover_url
+        if url and url.startswith("http") and url != self._last_cover_url:
+            self.set_cover_url(url)
+            self._last_cover_url = url
+
+
+    @staticmethod
+    def _status_text(snapshot: PlaybackSnapshot) -> str:
+        artist = snapshot.artists[0] if snapshot.artists else ""
+        return f"{snapshot.track_name}  -  {artist}" if artist else snapshot.track_name
+
+
     def handle_action(self, action: ActionEvent, source: str) -> None:
         """
         Handles any input from any backend. it has to have source for some reason
         """
+        queue = self.action_queue
+        target = self._target_account(action)
+        if queue and queue.pending(target):
+            # keep the order, older queued presses for this account must not override this one
+            queue.push(replace(action, account=target))
+            self.set_status(f"Waiting for Spotify, {queue.depth} action(s) queued")
+            return
+
         try:
-            if action.kind == ActionKind.PLAY_PAUSE:
-                self.spotify.toggle_pause_resume_auto()
+            self.execute_action(action)
+        except Exception as e:
+            if queue and self._queue_failed(replace(action, account=target), e):
+                self.set_status(f"Waiting for Spotify, {queue.depth} action(s) queued")
                 return
+            self.set_error(f"Error handling action: {e}")
 
-            if action.kind == ActionKind.NEXT:
-                self.spotify.next_auto()
-                return
 
-            if action.kind == ActionKind.PREV:
-                self.spotify.previous_auto()
-                return
+    def execute_action(self, action: ActionEvent) -> None:
+        """
+        Runs an action against Spotify and raises if it failed. Used directly
+        when replaying queued actions.
+        """
+        if action.kind == ActionKind.PLAY_PAUSE:
+            self.accounts.run(action.account, lambda svc: svc.toggle_pause_resume_auto())
+            return
 
-            if action.kind == ActionKind.SLOT:
-                print(f"slot :{action.kind, action.slot_id}")
-                if action.slot_id is None:
-                    return
-                binding = self.control_bindings.get(action.slot_id)
-                print(binding)
-                if not binding:
-                    self.set_error(f"No binding for slot {action.slot_id}")
-                    return
-
-                self._play_binding(binding)
+        if action.kind == ActionKind.NEXT:
+            self.accounts.run(action.account, lambda svc: svc.next_auto())
+            return
+
+        if action.kind == ActionKind.PREV:
+            self.accounts.run(action.account, lambda svc: svc.previous_auto())
+            return
+
+        if action.kind == ActionKind.SLOT:
+            if action.slot_id is None:
                 return
+            binding = self.control_bindings.get(action.slot_id)
+            log.debug("slot pressed", extra={"slot_id": action.slot_id, "binding": binding})
+            if self.prewarmer:
+                self.prewarmer.note_used(action.slot_id)
+            if not binding:
+                raise ValueError(f"No binding for slot {action.slot_id}")
 
-        except Exception as e:
-            self.set_error(f"Error handling action: {e}")
+            self.accounts.run(self._target_account(action), lambda svc: self._play_binding(svc, binding))
+            return
+
+
+    def _target_account(self, action: ActionEvent) -> Optional[str]:
+        """The account an action goes to, a slot without one uses its binding's."""
+        if action.account is None and action.kind == ActionKind.SLOT:
+            binding = self.control_bindings.get(action.slot_id)
+            return binding.account if binding else None
+        return action.account
+
+
+    def _queue_failed(self, action: ActionEvent, e: Exception) -> bool:
+        """
+        Queues the action for every account that was only temporarily unreachable.
+        """
+        if isinstance(e, AccountsError):
+            failed = [name for name, err in e.errors.items() if is_unavailable_error(err)]
+            for name in failed:
+                self.action_queue.push(replace(action, account=name))
+            if failed and len(failed) < len(e.errors):
+                self.set_error(f"Error handling action: {e}")
+            return bool(failed)
+
+        if is_unavailable_error(e):
+            self.action_queue.push(action)
+            return True
+        return False
+
+
+    def playback_state(self) -> dict:
+        """
+        The playback state from the last poll. Never does network calls.
+        """
+        state = self.events.last.to_state()
+        if self.action_queue:
+            state["queued"], state["queued_age"] = self.action_queue.stats()
+        return state
 
 
     def update_bindings(self, new_control_bindings: Dict[int, Binding]) -> None:
         self.control_bindings = new_control_bindings
+        self.warm_metadata()
+
+
+    def slot_labels(self) -> Dict[int, Tuple[str, str]]:
+        """
+        Label and tooltip for every bound slot, served from the metadata cache only.
+        """
+        labels = {}
+        for slot_id, binding in self.control_bindings.items():
+            meta = self.metadata.get(self._primary_uri(binding)) if self.metadata else None
+            name = binding.name or (meta.label if meta else "") or binding.uri
+            labels[slot_id] = (name, meta.tooltip if meta else binding.uri)
+        return labels
+
+
+    def warm_metadata(self) -> None:
+        """
+        Fills the metadata cache for every bound slot and the devices in the background.
+        Accounts that are not logged in yet are skipped, call it again once they are.
+        """
+        if not self.metadata:
+            return
+        if self.set_slot_labels:
+            self.set_slot_labels(self.slot_labels())  # whatever is on disk already
+        threading.Thread(target=self._warm_metadata, name="metadata-warmup", daemon=True).start()
+
+
+    def _warm_metadata(self) -> None:
+        with self._warm_lock:  # one warm-up at a time, the next one finds it all cached
+            self._warm_metadata_locked()
+
+
+    def _warm_metadata_locked(self) -> None:
+        self.metadata.evict_expired()
+
+        for slot_id, binding in list(self.control_bindings.items()):
+            account = None if binding.account in (None, ALL_ACCOUNTS) else binding.account
+            if not self._logged_in(account, slot_id):
+                continue
+            uri = self._primary_uri(binding)
+            try:
+                [meta] = self.accounts.run(account, lambda svc: self.metadata.resolve(svc, uri)).values()
+            except Exception as e:
+                self.set_error(f"Could not fetch metadata for slot {slot_id}: {e}")
+                continue
+            if meta and not binding.name:
+                extra = binding.uri.count(",")
+                binding.name = f"{meta.name} +{extra}" if extra else meta.name
+
+        for account in self.accounts.names():
+            if not self._logged_in(account):
+                continue
+            try:
+                [devices] = self.accounts.run(account, lambda svc: svc.list_devices()).values()
+            except Exception:
+                continue  # devices are warmed again on the next call
+            for device in devices:
+                self.metadata.put_device(device.id, device.name, device.type)
+
+        if self.set_slot_labels:
+            self.set_slot_labels(self.slot_labels())
+
+
+    def _logged_in(self, account: Optional[str], slot_id: Optional[int] = None) -> bool:
+        try:
+            return self.accounts.get(account).wait_logged_in(0)
+        except KeyError:
+            log.warning("Slot %s is bound to unknown account '%s', skipping it", slot_id, account)
+            return False
 
 
-    def get_cover_url(self, song: Optional[dict] = None) -> str:
-        if song:
-            images = song.get("album", {}).get("images", [])
-            if images:
-                cover_url = images[0]["url"]  # largest
-                return cover_url
-        return ""
+    @staticmethod
+    def _primary_uri(binding: Binding) -> str:
+        return binding.uri.split(",")[0].strip()
 
 
-    def _play_binding(self, binding: Binding) -> None:
+    def _play_binding(self, spotify, binding: Binding) -> None:
         if binding.type == "track":
-            self.spotify.play_track_auto(binding.uri)
+            spotify.play_track_auto(binding.uri)
         elif binding.type == "playlist":
-            self.spotify.play_playlist_auto(binding.uri)
+            spotify.play_playlist_auto(binding.uri)
+        elif binding.type == "album":
+            spotify.play_playlist_auto(binding.uri)  # context_uri works for albums too
         elif binding.type == "uris":
             uris = binding.uri.split(",")
-            self.spotify.play_uris_auto(uris)
-        # potentially add album here.
\ No newline at end of file
+            spotify.play_uris_auto(uris)
\ No newline at end of file
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Callable, ClassVar, Deque, List, Optional, Set, Tuple, Type
+
+
+@dataclass(frozen=True)
+class PlaybackSnapshot:
+    track_uri: str = ""
+    track_name: str = ""
+    artists: Tuple[str, ...] = ()
+    cover_url: str = ""
+    context_uri: str = ""
+    is_playing: bool = False
+    device_id: str = ""
+    device_name: str = ""
+    progress_ms: int = 0
+    duration_ms: int = 0
+    taken_at: float = field(default_factory=time.monotonic, compare=False)
+
+    @staticmethod
+    def from_playback(playback: Optional[dict]) -> "PlaybackSnapshot":
+        """Builds a snapshot from a /me/player response (None = nothing playing)."""
+        if not playback or not isinstance(playback, dict):
+            return PlaybackSnapshot()
+        item = playback.get("item") or {}
+        device = playback.get("device") or {}
+        images = (item.get("album") or {}).get("images") or []
+        return PlaybackSnapshot(
+            track_uri=item.get("uri", ""),
+            track_name=item.get("name", ""),
+            artists=tuple(a.get("name", "") for a in item.get("artists", [])),
+            cover_url=images[0]["url"] if images else "",  # largest
+            context_uri=(playback.get("context") or {}).get("uri", ""),
+            is_playing=bool(playback.get("is_playing")),
+            device_id=device.get("id") or "",
+            device_name=device.get("name") or "",
+            progress_ms=playback.get("progress_ms") or 0,
+            duration_ms=item.get("duration_ms") or 0,
+        )
+
+    def to_state(self) -> dict:
+        state = asdict(self)
+        del state["taken_at"]
+        state["artists"] = list(self.artists)
+        # the keys of the "state" op and event from before the snapshot, clients rely on them
+        state["uri"] = self.track_uri
+        state["name"] = self.track_name
+        return state
+
+
+@dataclass(frozen=True)
+class PlaybackEvent:
+    kind: ClassVar[str] = "playback"
+    snapshot: PlaybackSnapshot
+
+    def to_dict(self) -> dict:
+        """Event fields plus the new state, JSON friendly. The kind is not included."""
+        fields = {k: v for k, v in vars(self).items() if k != "snapshot"}
+        return {**fields, "state": self.snapshot.to_state()}
+
+
+@dataclass(frozen=True)
+class TrackChanged(PlaybackEvent):
+    kind: ClassVar[str] = "track_changed"
+    previous_uri: str = ""
+
+
+@dataclass(frozen=True)
+class PlayStateChanged(PlaybackEvent):
+    kind: ClassVar[str] = "play_state_changed"
+    is_playing: bool = False
+
+
+@dataclass(frozen=True)
+class DeviceChanged(PlaybackEvent):
+    kind: ClassVar[str] = "device_changed"
+    previous_device_id: str = ""
+
+
+@dataclass(frozen=True)
+class ProgressJumped(PlaybackEvent):
+    kind: ClassVar[str] = "progress_jumped"
+    expected_ms: int = 0
+    actual_ms: int = 0
+
+
+def diff_snapshots(
+    prev: Optional[PlaybackSnapshot],
+    cur: PlaybackSnapshot,
+    jump_tolerance_ms: int = 3000,
+) -> List[PlaybackEvent]:
+    """
+    Events that happened between two polls. The first snapshot counts as a
+    change of everything it has.
+    """
+    prev = prev or PlaybackSnapshot(taken_at=cur.taken_at)
+    events: List[PlaybackEvent] = []
+
+    if cur.track_uri != prev.track_uri:
+        events.append(TrackChanged(cur, previous_uri=prev.track_uri))
+    if cur.is_playing != prev.is_playing:
+        events.append(PlayStateChanged(cur, is_playing=cur.is_playing))
+    if cur.device_id != prev.device_id:
+        events.append(DeviceChanged(cur, previous_device_id=prev.device_id))
+
+    if cur.track_uri and cur.track_uri == prev.track_uri:
+        elapsed = (cur.taken_at - prev.taken_at) * 1000 if prev.is_playing else 0
+        expected = int(prev.progress_ms + elapsed)
+        if abs(cur.progress_ms - expected) > jump_tolerance_ms:
+            events.append(ProgressJumped(cur, expected_ms=expected, actual_ms=cur.progress_ms))
+    return events
+
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+class Subscription:
+    """
+    Bounded event queue of one consumer. Falling behind drops events (oldest or newest, per policy), counted in dropped.
+    """
+
+    def __init__(self, bus: "PlaybackEventBus", maxsize: int, policy: str, kinds: Optional[Set[Type[PlaybackEvent]]]) -> None:
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Unknown drop policy '{policy}'")
+        self._bus = bus
+        self._maxsize = maxsize
+        self._policy = policy
+        self._kinds = tuple(kinds) if kinds else None
+        self._queue: Deque[PlaybackEvent] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def wants(self, event: PlaybackEvent) -> bool:
+        return self._kinds is None or isinstance(event, self._kinds)
+
+    def offer(self, event: PlaybackEvent) -> None:
+        with self._cond:
+            if len(self._queue) >= self._maxsize:
+                self.dropped += 1
+                if self._policy == DROP_NEWEST:
+                    return
+                self._queue.popleft()
+            self._queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[PlaybackEvent]:
+        """Next event, or None on timeout or once closed."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self._closed, timeout=timeout):
+                return None
+            return self._queue.popleft() if self._queue else None
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+class PlaybackEventBus:
+    """
+    Turns successive playback snapshots into typed events and fans them out, either
+    to bounded queues (subscribe) or to cheap callbacks on the polling thread (subscribe_callback).
+    """
+
+    def __init__(self, jump_tolerance_ms: int = 3000) -> None:
+        self._jump_tolerance_ms = jump_tolerance_ms
+        self._lock = threading.Lock()
+        self._last: Optional[PlaybackSnapshot] = None
+        self._subscriptions: List[Subscription] = []
+        self._callbacks: List[Tuple[Callable[[PlaybackEvent], None], Optional[tuple]]] = []
+
+    @property
+    def last(self) -> PlaybackSnapshot:
+        return self._last or PlaybackSnapshot()
+
+    def subscribe(
+        self,
+        maxsize: int = 64,
+        policy: str = DROP_OLDEST,
+        kinds: Optional[Set[Type[PlaybackEvent]]] = None,
+    ) -> Subscription:
+        sub = Subscription(self, maxsize, policy, kinds)
+        with self._lock:
+            self._subscriptions.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subscriptions:
+                self._subscriptions.remove(sub)
+
+    def subscribe_callback(
+        self,
+        fn: Callable[[PlaybackEvent], None],
+        kinds: Optional[Set[Type[PlaybackEvent]]] = None,
+    ) -> None:
+        with self._lock:
+            self._callbacks.append((fn, tuple(kinds) if kinds else None))
+
+    def publish(self, snapshot: PlaybackSnapshot) -> List[PlaybackEvent]:
+        with self._lock:
+            events = diff_snapshots(self._last, snapshot, self._jump_tolerance_ms)
+            self._last = snapshot
+            subscriptions = list(self._subscriptions)
+            callbacks = list(self._callbacks)
+
+        for event in events:
+            for sub in subscriptions:
+                if sub.wants(event):
+                    sub.offer(event)
+            for fn, kinds in callbacks:
+                if kinds is None or isinstance(event, kinds):
+                    fn(event)
+        return events
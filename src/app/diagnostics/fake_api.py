@@ -0,0 +1,161 @@
+"""
+Minimal local stand-in for the Spotify Web API, used by the soak test.
+
+Serves just the endpoints the app calls (player state, devices, play /
+pause / next / previous, track / album / playlist lookups, the token
+endpoint) plus tiny cover images. Every GET /v1/me/player counts as one poll interval of simulated
+time, so tracks change on their own as the soak test polls.
+
+    python -m app.diagnostics.fake_api --port 0   # prints the chosen port
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse
+
+from app.bootstrap import SCOPE
+
+# 1x1 transparent PNG
+PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+
+class FakeSpotify:
+    def __init__(self, polls_per_track: int = 257, tracks: int = 50) -> None:
+        self.polls_per_track = polls_per_track  # ~180 s at a 0.7 s poll interval
+        self.tracks = tracks
+        self.base_url = ""
+        self._lock = threading.Lock()
+        self._polls = 0
+        self._index = 0
+        self._is_playing = True
+
+    def track(self, index: int) -> dict:
+        index %= self.tracks
+        return {
+            "type": "track",
+            "uri": f"spotify:track:soak{index}",
+            "id": f"soak{index}",
+            "name": f"Soak track {index}",
+            "artists": [{"name": f"Artist {index % 7}"}],
+            "album": {
+                "type": "album",
+                "uri": f"spotify:album:soak{index % 10}",
+                "name": f"Album {index % 10}",
+                "images": [
+                    {"url": f"{self.base_url}/images/{index}/640.png", "width": 640},
+                    {"url": f"{self.base_url}/images/{index}/64.png", "width": 64},
+                ],
+            },
+        }
+
+    def handle(self, method: str, path: str) -> Optional[dict]:
+        with self._lock:
+            if method == "GET" and path == "/v1/me/player":
+                self._polls += 1
+                if self._polls % self.polls_per_track == 0:
+                    self._index += 1
+                return {"is_playing": self._is_playing, "device": self.devices()["devices"][0],
+                        "item": self.track(self._index)}
+            if method == "GET" and path == "/v1/me/player/devices":
+                return self.devices()
+            if method == "PUT" and path == "/v1/me/player/play":
+                self._is_playing = True
+                return None
+            if method == "PUT" and path == "/v1/me/player/pause":
+                self._is_playing = False
+                return None
+            if method == "POST" and path == "/v1/me/player/next":
+                self._index += 1
+                return None
+            if method == "POST" and path == "/v1/me/player/previous":
+                self._index = max(0, self._index - 1)
+                return None
+            if method == "POST" and path == "/api/token":
+                return {"access_token": "soak", "token_type": "Bearer", "expires_in": 3600,
+                        "refresh_token": "soak", "scope": SCOPE}
+
+            m = re.fullmatch(r"/v1/(tracks|albums|playlists)/(\w+)", path)
+            if method == "GET" and m:
+                kind, item_id = m.group(1)[:-1], m.group(2)
+                item = {"type": kind, "uri": f"spotify:{kind}:{item_id}", "id": item_id,
+                        "name": f"{kind} {item_id}", "images": [], "artists": [],
+                        "owner": {"display_name": "soak"}, "snapshot_id": "1", "album": {"images": []}}
+                return item
+        raise KeyError(path)
+
+    def devices(self) -> dict:
+        return {"devices": [{"id": "soakdevice", "name": "Soak speaker", "type": "Speaker",
+                             "is_active": True, "volume_percent": 50}]}
+
+
+def make_server(api: FakeSpotify, port: int = 0) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def _respond(self, method: str) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            path = urlparse(self.path).path
+
+            m = re.fullmatch(r"/images/\d+/\d+\.png", path)
+            if m:
+                return self._send(200, PNG, "image/png")
+            try:
+                payload = api.handle(method, path)
+            except KeyError:
+                return self._send(404, b'{"error": {"status": 404}}', "application/json")
+            if payload is None:
+                return self._send(204, b"", "application/json")
+            self._send(200, json.dumps(payload).encode(), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._respond("GET")
+
+        def do_PUT(self):
+            self._respond("PUT")
+
+        def do_POST(self):
+            self._respond("POST")
+
+        def log_message(self, *_):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    api.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fake Spotify Web API for soak tests")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--polls-per-track", type=int, default=257)
+    args = parser.parse_args(argv)
+
+    server = make_server(FakeSpotify(polls_per_track=args.polls_per_track), args.port)
+    print(server.server_address[1], flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
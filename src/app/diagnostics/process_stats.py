@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+_IMPORTED_AT = time.time()
+
+
+@dataclass(frozen=True)
+class ProcessStats:
+    startup_s: float  # process start (or first import of this module) until now
+    rss_mb: Optional[float]
+    peak_rss_mb: Optional[float]
+    threads: int
+    qt_loaded: bool
+
+    def format(self, label: str) -> str:
+        rss = f"{self.rss_mb:.1f} MB" if self.rss_mb is not None else "n/a"
+        peak = f"{self.peak_rss_mb:.1f} MB" if self.peak_rss_mb is not None else "n/a"
+        return (
+            f"{label}: startup {self.startup_s:.2f}s, rss {rss} (peak {peak}), "
+            f"threads {self.threads}, qt {'loaded' if self.qt_loaded else 'not loaded'}"
+        )
+
+
+def process_stats() -> ProcessStats:
+    """
+    Resident memory and time since process start, used to compare the GUI
+    build against the headless daemon. Reads /proc on Linux and falls back
+    to resource (peak only) elsewhere.
+    """
+    rss, peak = _memory_mb()
+    return ProcessStats(
+        startup_s=time.time() - _process_start_time(),
+        rss_mb=rss,
+        peak_rss_mb=peak,
+        threads=threading.active_count(),
+        qt_loaded="PySide6" in sys.modules,
+    )
+
+
+def _memory_mb():
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        pass
+
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return None, peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _process_start_time() -> float:
+    try:
+        with open("/proc/self/stat") as f:
+            # field 22, after the ")" that closes the command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return _IMPORTED_AT
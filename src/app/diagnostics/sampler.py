@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Optional
+
+from .stacks import stack_labels, thread_frame
+from app.config.paths import get_cache_dir
+
+log = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Samples another thread's stack for a while, as collapsed stacks ("a;b;c 12" per line)
+    for flamegraph.pl / speedscope. Cheap enough to run against the live GUI thread.
+    """
+
+    def __init__(self, thread_ident: Optional[int] = None, interval_ms: float = 5) -> None:
+        self._ident = thread_ident or threading.main_thread().ident
+        self._interval = interval_ms / 1000
+        self._thread: Optional[threading.Thread] = None
+
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+    def sample(self, duration_s: float) -> Counter:
+        """Blocks for duration_s and returns collapsed stack -> sample count."""
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + duration_s
+        while time.monotonic() < deadline:
+            frame = thread_frame(self._ident)
+            if frame is None:
+                break
+            stacks[";".join(label.replace(";", ",") for label in stack_labels(frame))] += 1
+            del frame
+            time.sleep(self._interval)
+        return stacks
+
+
+    def start(self, duration_s: float, out_path: Path, on_done: Optional[Callable[[Path], None]] = None) -> None:
+        """Samples in a background thread and writes out_path when done."""
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+
+        def run():
+            stacks = self.sample(duration_s)
+            with open(out_path, "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            if on_done:
+                on_done(out_path)
+
+        self._thread = threading.Thread(target=run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+
+def profile_op(profiler: SamplingProfiler, name: str) -> Callable[[dict], dict]:
+    """
+    Control socket op that starts profiling on demand:
+      {"op": "profile", "seconds": 10} -> {"ok": true, "path": ".../profiles/gui-....folded"}
+    """
+    def op(request: dict) -> dict:
+        seconds = min(float(request.get("seconds", 10)), 600)
+        path = get_cache_dir("profiles") / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        profiler.start(seconds, path, on_done=lambda p: log.info("Profile written to %s", p))
+        return {"path": str(path), "seconds": seconds}
+    return op
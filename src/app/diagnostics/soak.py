@@ -0,0 +1,316 @@
+"""
+Long-run soak test.
+
+Drives the real controller, input backend and Spotify service against a
+local fake Web API (app.diagnostics.fake_api, run in a subprocess so its
+threads and sockets don't count) for hours of simulated time: one tick is
+one 0.7 s playback poll, ticks run back to back. Synthetic key presses go
+through the fake serial backend and the fake API changes track on its own.
+Every --login-every ticks the token is deleted, so the next login runs the
+redirect server of ensure_automatic_logging. Tokens and caches live in a
+temp dir.
+
+Every sample records RSS, traced Python heap (tracemalloc), live threads,
+open sockets and, with --qt, all live QObjects. The run fails if any of
+them keeps growing across the whole run.
+
+    python -m app.diagnostics.soak --hours 8
+    QT_QPA_PLATFORM=offscreen python -m app.diagnostics.soak --hours 8 --qt
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.bootstrap import SCOPE, serial_mapping
+from app.core.action_queue import OfflineActionQueue
+from app.core.controller import AppController, Binding
+from app.diagnostics.process_stats import process_stats
+from app.input.fake_serial import FakeSerialBackend
+from app.services.metadata_cache import MetadataCache
+from app.services.registry import SpotifyServiceRegistry
+from app.services.spotify_client import SpotifyService
+
+log = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.7  # seconds of simulated time per tick
+
+# How much a metric may grow over the run before monotonic growth counts as a leak
+TOLERANCE = {
+    "rss_mb": 10.0,
+    "heap_kb": 512.0,
+    "threads": 0,
+    "sockets": 0,
+    "qobjects": 0,
+}
+
+
+def open_sockets() -> int:
+    """Open sockets of this process (Linux), or all open fds as a fallback."""
+    fd_dir = Path("/proc/self/fd")
+    if not fd_dir.exists():
+        return -1
+    count = 0
+    for fd in fd_dir.iterdir():
+        try:
+            if os.readlink(fd).startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+def is_growing(values: List[float], tolerance: float, segments: int = 5) -> bool:
+    """
+    True when the peak of every segment of the run is higher than the one
+    before and the total growth exceeds tolerance. Peaks per segment rather
+    than single samples, so normal ups and downs (GC, cache fills) don't count.
+    """
+    if len(values) < segments * 2:
+        return False
+    size = len(values) // segments
+    peaks = [max(values[i * size:(i + 1) * size]) for i in range(segments)]
+    rising = all(b > a for a, b in zip(peaks, peaks[1:]))
+    return rising and peaks[-1] - peaks[0] > tolerance
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def live_qobjects() -> int:
+    """Every QObject alive on the C++ side that Python has seen, with its children."""
+    from PySide6.QtCore import QObject
+    from shiboken6 import Shiboken
+
+    seen = set()
+    for obj in Shiboken.getAllValidWrappers():
+        if isinstance(obj, QObject) and Shiboken.isValid(obj):
+            for o in [obj, *obj.findChildren(QObject)]:
+                seen.add(Shiboken.getCppPointer(o)[0])
+    return len(seen)
+
+
+def start_fake_api(polls_per_track: int) -> tuple:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.diagnostics.fake_api", "--port", "0", "--polls-per-track", str(polls_per_track)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    port = int(proc.stdout.readline())
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def write_fake_token(cache_path: str) -> None:
+    """A token the PKCE manager accepts without ever talking to Spotify."""
+    Path(cache_path).write_text(json.dumps({
+        "access_token": "soak",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+        "expires_at": int(time.time()) + 10 * 365 * 24 * 3600,
+        "refresh_token": "soak",
+        "scope": SCOPE,
+    }))
+
+
+class SoakRun:
+    def __init__(self, api_url: str, workdir: Path, qt: bool = False, seed: int = 1) -> None:
+        self._random = random.Random(seed)
+        self.samples: List[Dict[str, float]] = []
+        self.logins = 0
+
+        self._login_port = free_port()
+        service = SpotifyService(
+            client_id="soak",
+            redirect_uri=f"http://127.0.0.1:{self._login_port}/callback",
+            scope=SCOPE,
+            api_prefix=f"{api_url}/v1/",
+            cache_dir=workdir,
+            token_url=f"{api_url}/api/token",
+        )
+        write_fake_token(service.cache_path)
+        self.service = service
+        self.accounts = SpotifyServiceRegistry()
+        self.accounts.add("", service)
+
+        self.errors: List[str] = []
+        self.covers: List[str] = []
+        self.controller = AppController(
+            spotify_service=service,
+            control_bindings={
+                1: Binding(type="playlist", uri="spotify:playlist:soak1"),
+                2: Binding(type="track", uri="spotify:track:soak2"),
+            },
+            set_status=lambda text: None,
+            set_error=self._on_error,
+            set_cover_url=self._on_cover,
+            accounts=self.accounts,
+            metadata=MetadataCache(path=workdir / "metadata.sqlite"),
+            action_queue=OfflineActionQueue(path=workdir / "action_queue.jsonl"),
+        )
+        self.controller.action_queue.start(self.controller.execute_action, lambda e: False)
+
+        self.backend = FakeSerialBackend(serial_mapping())
+        self.backend.start(lambda action, source: self.controller.handle_action(action, source))
+        self.lines = list(serial_mapping().values())
+
+        self.qt_app = None
+        self.image_loader = None
+        if qt:
+            from PySide6.QtGui import QGuiApplication
+            from app.ui.image_loader import ImageLoader
+            self.qt_app = QGuiApplication.instance() or QGuiApplication([])
+            self.image_loader = ImageLoader(cache_dir=workdir / "image_cache")
+
+    def _on_error(self, text: str) -> None:
+        self.errors.append(text)
+        del self.errors[:-100]
+
+    def _on_cover(self, url: str) -> None:
+        if self.image_loader:
+            self.image_loader.load(url)
+
+    def tick(self, i: int, press_every: int, login_every: int = 0) -> None:
+        if login_every and i % login_every == 0:
+            self.relogin()
+        self.controller.refresh_playback()
+        if i % press_every == 0:
+            self.backend.inject(self._random.choice(self.lines))
+        if self.qt_app:
+            self.qt_app.processEvents()
+
+    def relogin(self) -> None:
+        """Token cache miss: log in through the redirect server, with a scripted browser."""
+        Path(self.service.cache_path).unlink()
+
+        def browser(url: str) -> None:
+            redirect = f"http://127.0.0.1:{self._login_port}/callback?code=soak"
+            with urllib.request.urlopen(redirect, timeout=5) as response:
+                response.read()
+
+        self.service.ensure_automatic_logging(port=self._login_port, on_login_url=browser)
+        self.logins += 1
+
+    def sample(self, i: int) -> Dict[str, float]:
+        stats = process_stats()
+        current, _ = tracemalloc.get_traced_memory()
+        row = {
+            "tick": i,
+            "sim_hours": round(i * POLL_INTERVAL / 3600, 3),
+            "rss_mb": round(stats.rss_mb or 0, 2),
+            "heap_kb": round(current / 1024, 1),
+            "threads": threading.active_count(),
+            "sockets": open_sockets(),
+            "logins": self.logins,
+        }
+        if self.image_loader:
+            row["qobjects"] = live_qobjects()
+        self.samples.append(row)
+        return row
+
+    def close(self) -> None:
+        self.backend.stop()
+        self.controller.action_queue.stop()
+        self.accounts.shutdown()
+        self.controller.metadata.close()
+
+
+def run(
+    hours: float,
+    press_every: int = 20,
+    login_every: int = 500,
+    samples: int = 200,
+    polls_per_track: int = 257,
+    qt: bool = False,
+    csv_path: Optional[Path] = None,
+    on_sample: Optional[Callable[[Dict[str, float]], None]] = None,
+) -> List[str]:
+    """
+    Runs the soak test and returns the metrics that kept growing (empty = pass).
+    """
+    ticks = int(hours * 3600 / POLL_INTERVAL)
+    sample_every = max(1, ticks // samples)
+    warmup = ticks // 10  # caches, pools and lazy imports settle first
+
+    api, api_url = start_fake_api(polls_per_track)
+    tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            soak = SoakRun(api_url, Path(workdir), qt=qt)
+            try:
+                for i in range(1, ticks + 1):
+                    soak.tick(i, press_every, login_every)
+                    if i >= warmup and i % sample_every == 0:
+                        row = soak.sample(i)
+                        if on_sample:
+                            on_sample(row)
+            finally:
+                soak.close()
+    finally:
+        tracemalloc.stop()
+        api.terminate()
+        api.wait(timeout=5)
+
+    if csv_path and soak.samples:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(soak.samples[0]))
+            writer.writeheader()
+            writer.writerows(soak.samples)
+
+    if soak.errors:
+        log.warning("Last error during soak: %s", soak.errors[-1])
+
+    return [
+        metric for metric, tolerance in TOLERANCE.items()
+        if metric in soak.samples[0] and is_growing([row[metric] for row in soak.samples], tolerance)
+    ] if soak.samples else []
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Soak test against a local fake Spotify API")
+    parser.add_argument("--hours", type=float, default=4.0, help="simulated hours")
+    parser.add_argument("--press-every", type=int, default=20, help="synthetic key press every N polls")
+    parser.add_argument("--login-every", type=int, default=500, help="delete the token and log in again every N polls, 0 = never")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--qt", action="store_true", help="also load covers through ImageLoader")
+    parser.add_argument("--csv", type=Path, help="write all samples to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level="INFO", format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    started = time.monotonic()
+    leaks = run(
+        hours=args.hours,
+        press_every=args.press_every,
+        login_every=args.login_every,
+        samples=args.samples,
+        qt=args.qt,
+        csv_path=args.csv,
+        on_sample=lambda row: log.info("sample %s", row),
+    )
+    log.info("Soaked %.1f simulated hours in %.0f s", args.hours, time.monotonic() - started)
+
+    if leaks:
+        log.error("Monotonic growth in: %s", ", ".join(leaks))
+        return 1
+    log.info("No monotonic growth detected")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
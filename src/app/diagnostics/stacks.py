@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from types import FrameType
+from typing import List, Optional
+
+_APP_DIR = str(Path(__file__).resolve().parent.parent)
+
+
+def thread_frame(thread_ident: int) -> Optional[FrameType]:
+    """Current innermost frame of another thread, None if it is gone."""
+    return sys._current_frames().get(thread_ident)
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+
+def stack_labels(frame: Optional[FrameType], limit: int = 64) -> List[str]:
+    """Outermost first, like a flame graph reads."""
+    labels = []
+    while frame is not None and len(labels) < limit:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def call_site(frame: Optional[FrameType]) -> str:
+    """
+    The innermost frame that belongs to the app, so a stall inside Qt or
+    spotipy is blamed on the app code that called it.
+    """
+    innermost = frame
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(_APP_DIR) and "diagnostics" not in frame.f_code.co_filename:
+            return frame_label(frame)
+        frame = frame.f_back
+    return frame_label(innermost) if innermost is not None else "<idle>"
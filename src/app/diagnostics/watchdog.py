@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .stacks import call_site, stack_labels, thread_frame
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class StallSite:
+    site: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    stack: List[str] = field(default_factory=list)  # stack of the longest stall
+
+
+class StallWatchdog:
+    """
+    Detects GUI event loop stalls: the loop calls beat() from a timer, and a missed beat
+    grabs the main thread's stack while the stall lasts. report() sums the time per call site.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 250,
+        check_interval_ms: float = 50,
+        thread_ident: Optional[int] = None,
+        on_stall: Optional[Callable[[str, float, List[str]], None]] = None,
+    ) -> None:
+        self._threshold = threshold_ms / 1000
+        self._interval = check_interval_ms / 1000
+        self._ident = thread_ident or threading.main_thread().ident
+        self._on_stall = on_stall
+
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._stall: Optional[tuple] = None  # (site, stack) of the stall in progress
+        self._sites: Dict[str, StallSite] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+
+    def beat(self) -> None:
+        """Called from the watched thread's event loop."""
+        now = time.monotonic()
+        with self._lock:
+            gap_ms = (now - self._last_beat) * 1000
+            self._last_beat = now
+            stall, self._stall = self._stall, None
+            if stall is None:
+                return
+            site, stack = stall
+            entry = self._sites.setdefault(site, StallSite(site))
+            entry.count += 1
+            entry.total_ms += gap_ms
+            if gap_ms > entry.max_ms:
+                entry.max_ms = gap_ms
+                entry.stack = stack
+
+        if self._on_stall:
+            self._on_stall(site, gap_ms, stack)
+
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._last_beat = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+
+    def sites(self) -> List[StallSite]:
+        with self._lock:
+            return sorted(self._sites.values(), key=lambda s: s.total_ms, reverse=True)
+
+
+    def report(self, top: int = 10) -> str:
+        sites = self.sites()[:top]
+        if not sites:
+            return "No event loop stalls recorded."
+        lines = [f"{'stalls':>6} {'total ms':>9} {'max ms':>8}  call site"]
+        for s in sites:
+            lines.append(f"{s.count:>6} {s.total_ms:>9.0f} {s.max_ms:>8.0f}  {s.site}")
+        worst = sites[0]
+        lines.append("")
+        lines.append(f"Longest stall at {worst.site}:")
+        lines.extend(f"  {frame}" for frame in worst.stack)
+        return "\n".join(lines)
+
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            with self._lock:
+                if self._stall is not None or time.monotonic() - self._last_beat < self._threshold:
+                    continue
+                frame = thread_frame(self._ident)
+                self._stall = (call_site(frame), stack_labels(frame))
+                del frame  # don't keep the main thread's locals alive
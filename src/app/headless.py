@@ -0,0 +1,161 @@
+"""
+Headless daemon for stations without a screen.
+
+Runs the controller, the input backends and the Spotify services on plain
+threads. Nothing in here (or in what it imports) may import PySide6, so
+status and errors go to the log instead of widgets.
+
+    python -m app.headless            # run until SIGINT / SIGTERM
+    python -m app.headless --report   # start up, log memory and startup time, exit
+    python -m app.headless --finish-login 'http://127.0.0.1:8888/callback?code=...' [--account bar]
+
+The last one is for a first login from another machine: open the logged
+login url there, then paste the address the browser was sent to (it fails
+to load, that's fine) into the running daemon.
+
+Scripts talk to it through the control socket, see app.input.control_socket.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import signal
+import threading
+from typing import Callable
+
+from app.bootstrap import LOG_LEVELS, build_accounts, default_bindings, hotkey_mapping, serial_mapping
+from app.config.log import dropped_logs, recent_logs, setup_logging
+from app.core.action_queue import OfflineActionQueue
+from app.core.controller import AppController
+from app.core.playback_events import TrackChanged
+from app.diagnostics.process_stats import process_stats
+from app.diagnostics.sampler import SamplingProfiler, profile_op
+from app.input.control_socket import ControlSocketBackend, send_request
+from app.input.fake_serial import FakeSerialBackend
+from app.input.led_feedback import LedFeedback
+from app.services.metadata_cache import MetadataCache
+from app.services.prewarm import SlotPrewarmer
+from app.services.spotify_client import is_unavailable_error
+
+log = logging.getLogger("app.headless")
+
+
+def _on_change(fn: Callable[[str], None]) -> Callable[[str], None]:
+    """The controller repeats the same status every poll, only log changes."""
+    last = {"text": None}
+
+    def wrapper(text: str) -> None:
+        if text != last["text"]:
+            last["text"] = text
+            fn(text)
+    return wrapper
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Macro keyboard Spotify daemon without GUI")
+    parser.add_argument("--poll-interval", type=float, default=0.7, help="seconds between playback polls")
+    parser.add_argument("--report", action="store_true", help="log memory and startup time, then exit")
+    parser.add_argument("--log-level", default="INFO")
+    parser.add_argument("--finish-login", metavar="URL", help="hand the redirected login url to the running daemon")
+    parser.add_argument("--account", default="", help="account for --finish-login, default account if empty")
+    args = parser.parse_args(argv)
+
+    if args.finish_login:
+        response = send_request({"op": "finish_login", "account": args.account, "url": args.finish_login})
+        print(json.dumps(response))
+        return 0 if response.get("ok") else 1
+
+    logging_handle = setup_logging(level=args.log_level, levels=LOG_LEVELS)
+
+    accounts = build_accounts()
+    control_socket = ControlSocketBackend(
+        state_provider=lambda: controller.playback_state(),
+        logs_provider=recent_logs,
+        ops={
+            "profile": profile_op(SamplingProfiler(), "headless"),
+            "log_stats": lambda request: {"dropped": dropped_logs()},
+            "finish_login": lambda request: _finish_login(accounts, request),
+        },
+    )
+    controller = AppController(
+        spotify_service=accounts.get(),
+        control_bindings=default_bindings(),
+        set_status=_on_change(lambda text: log.info("status: %s", text)),
+        set_error=_on_change(lambda text: log.error("%s", text)),
+        set_cover_url=lambda url: None,  # nothing to show it on
+        accounts=accounts,
+        metadata=MetadataCache(),
+        action_queue=OfflineActionQueue(),
+    )
+    controller.prewarmer = SlotPrewarmer(
+        accounts,
+        bindings=lambda: controller.control_bindings,
+        metadata=controller.metadata,
+    )
+    controller.prewarmer.start()
+    controller.events.subscribe_callback(lambda event: control_socket.publish(event.kind, **event.to_dict()))
+    controller.events.subscribe_callback(
+        lambda event: control_socket.publish("state", state=controller.playback_state()), kinds={TrackChanged}
+    )
+    controller.events.subscribe_callback(lambda event: log.info("playback %s", event.kind, extra=event.to_dict()))
+    controller.action_queue.start(controller.execute_action, is_unavailable_error, on_error=controller.set_error)
+
+    accounts.login(
+        on_login_url=lambda account, url: log.warning(
+            "Spotify login needed for account '%s', open: %s (from another machine, pass the address "
+            "it redirects to with: python -m app.headless --finish-login URL --account '%s')",
+            account or "default", url, account,
+        ),
+        on_logged_in=lambda account: controller.warm_metadata(),
+    )
+
+    serial = FakeSerialBackend(serial_mapping())
+    backends = [serial, control_socket]
+    led_feedback = LedFeedback(controller.events, serial.write, lambda: controller.control_bindings, serial_mapping())
+    led_feedback.start()
+    try:
+        from app.input.hotkeys_pynput import HotkeyBackendPynput
+        backends.append(HotkeyBackendPynput(hotkey_mapping()))
+    except Exception as e:  # no X server / pynput on most appliances
+        log.info("Hotkeys disabled: %s", e)
+
+    for backend in backends:
+        if not backend.is_supported():
+            log.info("%s not supported here, skipping", type(backend).__name__)
+            continue
+        backend.start(lambda action, source: controller.handle_action(action, source))
+
+    log.info(process_stats().format("headless"))
+    if args.report:
+        return _shutdown(backends + [led_feedback], accounts, controller, logging_handle)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    while not stop.wait(args.poll_interval):
+        controller.refresh_playback()
+
+    return _shutdown(backends + [led_feedback], accounts, controller, logging_handle)
+
+
+def _finish_login(accounts, request: dict) -> dict:
+    account = request.get("account", "")
+    accounts.get(account).finish_login(request["url"])
+    log.info("Logged in account '%s' from a pasted redirect url", account or "default")
+    return {}
+
+
+def _shutdown(backends, accounts, controller, logging_handle) -> int:
+    for backend in backends:
+        backend.stop()
+    controller.action_queue.stop()
+    controller.prewarmer.stop()
+    accounts.shutdown()
+    logging_handle.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
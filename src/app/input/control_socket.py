@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import selectors
+import socket
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .base import InputBackend
+from app.config.paths import get_cache_dir
+from app.core.actions import ActionEvent, ActionKind
+
+
+MAX_LINE = 64 * 1024  # a request line longer than this closes the connection
+MAX_OUTBUF = 1024 * 1024  # a client that stops reading is dropped past this
+
+
+def send_request(request: dict, path: Optional[str] = None, timeout: float = 10.0) -> dict:
+    """
+    One request to a running app over its Unix socket, returns the response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or str(get_cache_dir() / "control.sock"))
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+@dataclass
+class _Client:
+    sock: socket.socket
+    inbuf: bytes = b""
+    outbuf: bytearray = field(default_factory=bytearray)
+    subscribed: bool = False
+
+
+class ControlSocketBackend(InputBackend):
+    """
+    Local control API: newline delimited JSON over a Unix socket (localhost TCP as fallback).
+      {"op": "actions", "actions": [{"kind": "slot", "slot_id": 1, "account": "*"}]}
+      {"op": "state"}       -> {"ok": true, "state": {...}}
+      {"op": "subscribe"}   -> {"ok": true}, then {"event": ..., ...} lines:
+          "state"              {"state": {...}} on every track change, same as the state op
+          "track_changed"      {"previous_uri", "state"}
+          "play_state_changed" {"is_playing", "state"}
+          "device_changed"     {"previous_device_id", "state"}
+          "progress_jumped"    {"expected_ms", "actual_ms", "state"}
+      {"op": "logs", "limit": 50} -> {"ok": true, "logs": [...]}
+      {"op": "ping"}
+    Extra ops come in through ops (name -> fn(request) -> response fields) and run on the socket thread.
+    """
+
+    def __init__(
+        self,
+        state_provider: Callable[[], dict],
+        logs_provider: Optional[Callable[[Optional[int]], List[dict]]] = None,
+        ops: Optional[Dict[str, Callable[[dict], dict]]] = None,
+        path: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+    ) -> None:
+        self._state_provider = state_provider
+        self._logs_provider = logs_provider
+        self._ops = ops or {}
+        self._use_unix = port is None and hasattr(socket, "AF_UNIX")
+        self._path = path or str(get_cache_dir() / "control.sock")
+        self._host = host
+        self._port = port if port is not None else 8765
+
+        self._emit: Optional[Callable[[ActionEvent, str], None]] = None
+        self._actions: "queue.Queue[Optional[ActionEvent]]" = queue.Queue()
+        self._events: "queue.Queue[bytes]" = queue.Queue()
+        self._clients: Dict[int, _Client] = {}
+        self._stop = threading.Event()
+        self._threads = []
+        self._server: Optional[socket.socket] = None
+        self._wakeup_r: Optional[socket.socket] = None
+        self._wakeup_w: Optional[socket.socket] = None
+
+
+    @property
+    def address(self) -> str:
+        return self._path if self._use_unix else f"{self._host}:{self._port}"
+
+
+    def is_supported(self) -> bool:
+        return True
+
+
+    def start(self, emit: Callable[[ActionEvent, str], None]) -> None:
+        self._emit = emit
+        self._stop.clear()
+
+        if self._use_unix:
+            Path(self._path).unlink(missing_ok=True)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._server.bind(self._path)
+            os.chmod(self._path, 0o600)  # only the owner may drive the app
+        else:
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._server.bind((self._host, self._port))
+            self._port = self._server.getsockname()[1]
+        self._server.listen(16)
+        self._server.setblocking(False)
+
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+
+        self._threads = [
+            threading.Thread(target=self._serve, name="control-socket", daemon=True),
+            threading.Thread(target=self._dispatch, name="control-dispatch", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._actions.put(None)
+        self._wakeup()
+        for t in self._threads:
+            t.join(timeout=2)
+        self._threads = []
+        for sock in (self._wakeup_r, self._wakeup_w):
+            if sock:
+                sock.close()
+        self._wakeup_r = self._wakeup_w = None
+        if self._use_unix:
+            Path(self._path).unlink(missing_ok=True)
+
+
+    def publish(self, event: str, **payload) -> None:
+        """
+        Push an event to every subscribed client. Safe to call from any thread.
+        """
+        self._events.put(self._encode({"event": event, **payload}))
+        self._wakeup()
+
+
+    def _serve(self) -> None:
+        sel = selectors.DefaultSelector()
+        sel.register(self._server, selectors.EVENT_READ, "accept")
+        sel.register(self._wakeup_r, selectors.EVENT_READ, "wakeup")
+
+        try:
+            while not self._stop.is_set():
+                for key, mask in sel.select(timeout=1.0):
+                    if key.data == "accept":
+                        self._accept(sel)
+                    elif key.data == "wakeup":
+                        self._drain_wakeup()
+                        self._broadcast(sel)
+                    else:
+                        client = key.data
+                        if mask & selectors.EVENT_READ:
+                            self._read(sel, client)
+                        if mask & selectors.EVENT_WRITE and client.sock.fileno() in self._clients:
+                            self._write(sel, client)
+        finally:
+            for client in list(self._clients.values()):
+                self._close(sel, client)
+            sel.close()
+            self._server.close()
+
+
+    def _accept(self, sel: selectors.BaseSelector) -> None:
+        try:
+            sock, _ = self._server.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        sock.setblocking(False)
+        client = _Client(sock)
+        self._clients[sock.fileno()] = client
+        sel.register(sock, selectors.EVENT_READ, client)
+
+
+    def _read(self, sel: selectors.BaseSelector, client: _Client) -> None:
+        try:
+            data = client.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(sel, client)
+            return
+
+        client.inbuf += data
+        *lines, client.inbuf = client.inbuf.split(b"\n")
+        if len(client.inbuf) > MAX_LINE:
+            self._close(sel, client)
+            return
+
+        for line in lines:
+            if line.strip():
+                self._send(sel, client, self._handle(client, line))
+
+
+    def _handle(self, client: _Client, line: bytes) -> bytes:
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+            if op == "actions":
+                actions = [self._parse_action(a) for a in request.get("actions", [])]
+                for action in actions:  # parse all first, a bad batch queues nothing
+                    self._actions.put(action)
+                return self._encode({"ok": True, "queued": len(actions)})
+            if op == "state":
+                return self._encode({"ok": True, "state": self._state_provider()})
+            if op == "logs" and self._logs_provider:
+                return self._encode({"ok": True, "logs": self._logs_provider(request.get("limit"))})
+            if op == "subscribe":
+                client.subscribed = True
+                return self._encode({"ok": True})
+            if op == "ping":
+                return self._encode({"ok": True})
+            if op in self._ops:
+                return self._encode({"ok": True, **self._ops[op](request)})
+            raise ValueError(f"Unknown op '{op}'")
+        except Exception as e:
+            return self._encode({"ok": False, "error": str(e)})
+
+
+    @staticmethod
+    def _parse_action(data: dict) -> ActionEvent:
+        slot_id = data.get("slot_id")
+        return ActionEvent(
+            kind=ActionKind(data["kind"]),
+            slot_id=int(slot_id) if slot_id is not None else None,
+            account=data.get("account"),
+        )
+
+
+    def _broadcast(self, sel: selectors.BaseSelector) -> None:
+        while True:
+            try:
+                line = self._events.get_nowait()
+            except queue.Empty:
+                return
+            for client in list(self._clients.values()):
+                if client.subscribed:
+                    self._send(sel, client, line)
+
+
+    def _send(self, sel: selectors.BaseSelector, client: _Client, line: bytes) -> None:
+        if client.sock.fileno() not in self._clients:
+            return
+        if len(client.outbuf) + len(line) > MAX_OUTBUF:
+            self._close(sel, client)  # slow consumer
+            return
+        was_empty = not client.outbuf
+        client.outbuf += line
+        if was_empty:
+            self._write(sel, client)
+
+
+    def _write(self, sel: selectors.BaseSelector, client: _Client) -> None:
+        try:
+            sent = client.sock.send(client.outbuf)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._close(sel, client)
+            return
+        del client.outbuf[:sent]
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outbuf else 0)
+        sel.modify(client.sock, events, client)
+
+
+    def _close(self, sel: selectors.BaseSelector, client: _Client) -> None:
+        fd = client.sock.fileno()
+        if self._clients.pop(fd, None) is None:
+            return
+        sel.unregister(client.sock)
+        client.sock.close()
+
+
+    def _dispatch(self) -> None:
+        while not self._stop.is_set():
+            action = self._actions.get()
+            if action is None:
+                return
+            if self._emit:
+                self._emit(action, "control_socket")
+
+
+    def _wakeup(self) -> None:
+        sock = self._wakeup_w
+        if sock is None:
+            return  # not started, events wait in the queue
+        try:
+            sock.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # already a wakeup pending, or just stopped
+
+
+    def _drain_wakeup(self) -> None:
+        try:
+            while self._wakeup_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+
+    @staticmethod
+    def _encode(obj: dict) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), default=str).encode() + b"\n"
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import threading
 import queue
+from collections import deque
 from typing import Callable, Dict, Optional
 
 from .base import InputBackend
@@ -12,14 +13,17 @@ class FakeSerialBackend(InputBackend):
     Simulerer en serial enhed:
     - du kan kalde backend.inject("SLOT_1") fra GUI/test
     - backend oversætter til Action og emitter
+    - write() simulerer linjer sendt tilbage til enheden (fx LED'er)
     """
 
     def __init__(self, mapping: Dict[ActionEvent, str]) -> None:
-        self._mapping = mapping
+        # mapping is action -> line like the other backends, look ups go line -> action
+        self._mapping = {line: action for action, line in mapping.items()}
         self._emit: Optional[Callable[[ActionEvent, str], None]] = None
         self._q: "queue.Queue[str]" = queue.Queue()
         self._stop = threading.Event()
         self._thread: Optional[threading.Thread] = None
+        self.sent: "deque[str]" = deque(maxlen=100)  # what a real device would have received
 
     def is_supported(self) -> bool:
         return True
@@ -44,6 +48,13 @@ class FakeSerialBackend(InputBackend):
 
     def stop(self) -> None:
         self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def write(self, line: str) -> None:
+        """Simuler at vi sender en linje til enheden."""
+        self.sent.append(line)
 
     def inject(self, line: str) -> None:
         """Simuler at serial modtager en linje."""
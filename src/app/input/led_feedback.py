@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Optional
+
+from app.core.actions import ActionEvent, ActionKind
+from app.core.playback_events import (
+    PlaybackEventBus,
+    PlaybackSnapshot,
+    PlayStateChanged,
+    TrackChanged,
+)
+
+
+class LedFeedback:
+    """
+    Lights play/pause while playing and the slot key whose context plays,
+    as "LED <key line> <0|1>" lines. Only changes are sent, from its own thread.
+    """
+
+    def __init__(
+        self,
+        events: PlaybackEventBus,
+        write: Callable[[str], None],
+        bindings: Callable[[], Dict[int, object]],
+        mapping: Dict[ActionEvent, str],
+    ) -> None:
+        self._events = events
+        self._write = write
+        self._bindings = bindings
+        self._mapping = mapping
+        self._lit: Dict[str, bool] = {}
+        self._sub = None
+        self._thread: Optional[threading.Thread] = None
+
+
+    def start(self) -> None:
+        self._sub = self._events.subscribe(maxsize=16, kinds={TrackChanged, PlayStateChanged})
+        self._thread = threading.Thread(target=self._run, name="led-feedback", daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        if self._sub:
+            self._sub.close()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+
+    def update(self, snapshot: PlaybackSnapshot) -> None:
+        wanted: Dict[str, bool] = {}
+        play_key = self._mapping.get(ActionEvent(ActionKind.PLAY_PAUSE))
+        if play_key:
+            wanted[play_key] = snapshot.is_playing
+
+        playing = {snapshot.context_uri, snapshot.track_uri} - {""}
+        for slot_id, binding in self._bindings().items():
+            key = self._mapping.get(ActionEvent(ActionKind.SLOT, slot_id))
+            if key:
+                uris = {u.strip() for u in binding.uri.split(",")}
+                wanted[key] = bool(uris & playing)
+
+        for key, on in wanted.items():
+            if self._lit.get(key) != on:
+                self._write(f"LED {key} {int(on)}")
+                self._lit[key] = on
+
+
+    def _run(self) -> None:
+        while not self._sub.closed:
+            event = self._sub.get(timeout=1.0)
+            if event is not None:
+                self.update(event.snapshot)
@@ -1,17 +1,34 @@
 import sys
+import logging
+import webbrowser
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import QTimer
 
 from app.ui.main_window import MainWindow
 from app.ui.image_loader import ImageLoader
-from app.core.actions import ActionEvent, ActionKind
-from app.core.controller import AppController, Binding
-from app.services.spotify_client import SpotifyService
+from app.ui.queue_panel import QueuePanel
+from app.core.controller import AppController
+from app.core.playback_events import TrackChanged
+from app.services.metadata_cache import MetadataCache
+from app.services.prewarm import SlotPrewarmer
+from app.services.spotify_client import is_unavailable_error
+from app.core.action_queue import OfflineActionQueue
+from app.services.library_index import LibraryIndex, LibraryIndexer
 from app.input.fake_serial import FakeSerialBackend
+from app.input.led_feedback import LedFeedback
 from app.input.hotkeys_pynput import HotkeyBackendPynput
+from app.input.control_socket import ControlSocketBackend
+from app.diagnostics.process_stats import process_stats
+from app.diagnostics.sampler import SamplingProfiler, profile_op
+from app.diagnostics.watchdog import StallWatchdog
+from app.config.log import dropped_logs, recent_logs, setup_logging
+from app.bootstrap import LOG_LEVELS, build_accounts, default_bindings, serial_mapping, hotkey_mapping
+
+log = logging.getLogger("app.main")
 
 
 def main():
+    logging_handle = setup_logging(levels=LOG_LEVELS)
     app = QApplication(sys.argv)
     window = MainWindow()
 
@@ -31,57 +48,97 @@ def main():
         window.set_cover(pix)
 
     image_loader.loaded.connect(on_image_loaded)
-    image_loader.failed.connect(lambda url, err: print(f"Image load failed for {url}: {err}"))
+    image_loader.failed.connect(lambda url, err: log.warning("Image load failed for %s: %s", url, err))
 
 
     # Run services
-    spotify = SpotifyService(
-        client_id="4075de68534e4c0c92d89a9c9c21d29f",
-        redirect_uri="http://127.0.0.1:8888/callback",
-        scope="user-read-playback-state user-modify-playback-state",
-    )
-
-    # Setup bindings. This will be done from a settings / binding window later
-    control_bindings = {
-        1: Binding(type="playlist", uri="spotify:playlist:4zqPelMTbUfaSpAKWHux7M"),
-        2: Binding(type="track", uri="spotify:track:6woV8uWxn7rcLZxJKYruS1"),
-    }
+    accounts = build_accounts()
+    spotify = accounts.get()
 
+    # Event loop stall detection, the heartbeat timer runs on the GUI thread
+    watchdog = StallWatchdog(
+        threshold_ms=250,
+        on_stall=lambda site, ms, stack: log.warning("GUI stalled %.0f ms at %s", ms, site, extra={"stack": stack}),
+    )
+    heartbeat = QTimer()
+    heartbeat.setInterval(50)
+    heartbeat.timeout.connect(watchdog.beat)
+    heartbeat.start()
+    watchdog.start()
+
+    # Local control API for scripts, answers from the controller's cached state
+    control_socket = ControlSocketBackend(
+        state_provider=lambda: controller.playback_state(),
+        logs_provider=recent_logs,
+        ops={
+            "profile": profile_op(SamplingProfiler(), "gui"),
+            "stalls": lambda request: {"report": watchdog.report()},
+            "log_stats": lambda request: {"dropped": dropped_logs()},
+        },
+    )
 
     # Start action and ui controller
     controller = AppController(
         spotify_service=spotify,
-        control_bindings=control_bindings,
+        control_bindings=default_bindings(),
         set_status=window.set_status,
         set_error=window.set_error,
         set_cover_url=set_cover_url,
+        accounts=accounts,
+        metadata=MetadataCache(),
+        set_slot_labels=window.set_slot_labels,
+        action_queue=OfflineActionQueue(),
+    )
+    controller.prewarmer = SlotPrewarmer(
+        accounts,
+        bindings=lambda: controller.control_bindings,
+        metadata=controller.metadata,
+        prefetch_cover=image_loader.queue_load,
+    )
+    controller.prewarmer.start()
+    controller.events.subscribe_callback(lambda event: control_socket.publish(event.kind, **event.to_dict()))
+    controller.events.subscribe_callback(
+        lambda event: control_socket.publish("state", state=controller.playback_state()), kinds={TrackChanged}
     )
 
+    # Up next / history, reloaded when the track changes rather than every poll
+    queue_panel = QueuePanel(spotify, image_loader)
+    window.add_side_panel(queue_panel)
+    controller.events.subscribe_callback(lambda event: queue_panel.refresh(), kinds={TrackChanged})
+    controller.action_queue.start(controller.execute_action, is_unavailable_error, on_error=window.set_error)
+    controller.warm_metadata()
+
+    # Local search index over the library, used to build slot bindings
+    library_index = LibraryIndex()
+    library_indexer = LibraryIndexer(spotify, library_index, on_error=window.set_error)
+    library_indexer.start()
+
     timer = QTimer()
     timer.setInterval(700)
     timer.timeout.connect(controller.refresh_playback)
-    timer.timeout.connect(spotify.ensure_automatic_logging)
     timer.start()
 
+    # Log in missing accounts one by one, off the GUI thread
+    def on_login_url(account: str, url: str) -> None:
+        window.set_status(f"Log in to Spotify for '{account or 'default'}' in the browser")
+        webbrowser.open(url)
+
+    def on_logged_in(account: str) -> None:
+        controller.warm_metadata()  # slot labels are rebuilt as each account gets its token
+        if account == accounts.default:
+            queue_panel.refresh()  # nothing may play yet, so no TrackChanged to load it
+
+    accounts.login(on_login_url=on_login_url, on_logged_in=on_logged_in)
+
     # Start backends
-    backend = FakeSerialBackend({ # These should be redefined later from bindings
-        ActionEvent(ActionKind.SLOT, 1): "SLOT_1",
-        ActionEvent(ActionKind.SLOT, 2): "SLOT_2",
-        ActionEvent(ActionKind.PLAY_PAUSE): "PLAY_PAUSE",
-        ActionEvent(ActionKind.NEXT): "NEXT",
-        ActionEvent(ActionKind.PREV): "PREV",
-    })
-
-    hotkey_backend = HotkeyBackendPynput({ # These should be redefined later from bindings
-        ActionEvent(ActionKind.SLOT, 1) : "<ctrl>+<alt>+<f1>",
-        ActionEvent(ActionKind.SLOT, 2): "<ctrl>+<alt>+<f2>",
-        ActionEvent(ActionKind.PLAY_PAUSE): "<ctrl>+<alt>+p",
-        ActionEvent(ActionKind.NEXT): "<ctrl>+<alt>+<right>",
-        ActionEvent(ActionKind.PREV): "<ctrl>+<alt>+<left>", 
-    })
+    backend = FakeSerialBackend(serial_mapping())
+    hotkey_backend = HotkeyBackendPynput(hotkey_mapping())
 
     backend.start(lambda action, source: controller.handle_action(action, source))
+    led_feedback = LedFeedback(controller.events, backend.write, lambda: controller.control_bindings, serial_mapping())
+    led_feedback.start()
     hotkey_backend.start(lambda action, source: controller.handle_action(action, source))
+    control_socket.start(lambda action, source: controller.handle_action(action, source))
 
     # Connect UI to the fake serial backend
     window.action_requested.connect(lambda a: controller.handle_action(a, "ui"))
@@ -89,11 +146,24 @@ def main():
     # show window in background image size
     window.resize(320*3, 180*3)
     window.show()
+
+    # same line as the headless daemon logs, to compare memory and startup
+    QTimer.singleShot(0, lambda: log.info(process_stats().format("gui")))
     
     exit_code = app.exec()
 
+    watchdog.stop()
+    controller.prewarmer.stop()
+    log.info("Event loop stalls:\n%s", watchdog.report())
+    led_feedback.stop()
     backend.stop()
+    control_socket.stop()
+    controller.action_queue.stop()
+    accounts.shutdown()
+    library_indexer.stop()
+    library_index.close()
+    logging_handle.stop()
     sys.exit(exit_code)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
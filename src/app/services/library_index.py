@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+import logging
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config.paths import get_cache_dir
+
+
+SAVED_TRACKS = "saved:tracks"
+SAVED_ALBUMS = "saved:albums"
+PLAYLISTS = "saved:playlists"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LibraryItem:
+    uri: str
+    kind: str  # "track" / "album" / "playlist", same values as Binding.type
+    name: str
+    subtitle: str = ""  # artists / owner
+
+    @staticmethod
+    def from_item(item: dict) -> "LibraryItem":
+        kind = item.get("type", "")
+        if kind == "playlist":
+            subtitle = (item.get("owner") or {}).get("display_name") or ""
+        else:
+            subtitle = ", ".join(a.get("name", "") for a in item.get("artists") or [])
+        return LibraryItem(uri=item["uri"], kind=kind, name=item.get("name") or "", subtitle=subtitle)
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents, so "Beyoncé" matches "beyonce"."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return "".join(c if c.isalnum() else " " for c in normalize(text)).split()
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LibraryIndex:
+    """
+    Local search index over playlists, saved tracks and albums, persisted in SQLite.
+    Items belong to sources (a playlist, saved tracks ...) and go when the last one drops them.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self._path = Path(path) if path else get_cache_dir() / "library.sqlite"
+        self._lock = threading.RLock()
+
+        self._items: Dict[str, LibraryItem] = {}
+        self._members: Dict[str, Set[str]] = {}  # source -> item uris
+        self._versions: Dict[str, str] = {}  # source -> version
+        self._refcount: Counter = Counter()  # item uri -> number of sources
+
+        self._tokens: List[Tuple[str, str]] = []  # (token, uri), always sorted
+        self._trigrams: Dict[str, Set[str]] = {}  # trigram -> item uris
+        self._item_trigrams: Dict[str, Set[str]] = {}
+
+        self._db = sqlite3.connect(str(self._path), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS items (uri TEXT PRIMARY KEY, kind TEXT, name TEXT, subtitle TEXT);"
+            "CREATE TABLE IF NOT EXISTS members (source TEXT, uri TEXT, PRIMARY KEY (source, uri));"
+            "CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, version TEXT);"
+        )
+        self._loaded = False
+
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+    def version(self, source: str) -> Optional[str]:
+        return self._versions.get(source)
+
+
+    def sources(self) -> List[str]:
+        return list(self._versions)
+
+
+    def get(self, uri: str) -> Optional[LibraryItem]:
+        return self._items.get(uri)
+
+
+    def add(self, source: str, items: Iterable[LibraryItem]) -> None:
+        """
+        Adds items to a source (one page at a time while streaming).
+        """
+        with self._lock:
+            members = self._members.setdefault(source, set())
+            rows = []
+            renamed = set()
+            fresh = []
+            for item in items:
+                old = self._items.get(item.uri)
+                self._items[item.uri] = item
+                if item.uri not in members:
+                    members.add(item.uri)
+                    self._refcount[item.uri] += 1
+                if old is None:
+                    fresh.append(item)
+                elif old != item:
+                    renamed.add(item.uri)
+                rows.append(item)
+
+            if renamed:
+                self._unindex(renamed)
+            self._index([self._items[uri] for uri in renamed] + fresh)
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)",
+                [(i.uri, i.kind, i.name, i.subtitle) for i in rows],
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO members VALUES (?, ?)", [(source, i.uri) for i in rows]
+            )
+            self._db.commit()
+
+
+    def replace(self, source: str, items: Iterable[LibraryItem], version: str) -> None:
+        """
+        Replaces the content of a source, e.g. after its snapshot_id changed.
+        """
+        items = list(items)
+        with self._lock:
+            self.add(source, items)
+            self.finish(source, {item.uri for item in items}, version)
+
+
+    def finish(self, source: str, keep: Set[str], version: str) -> None:
+        """
+        Ends a streamed sync: drops the members that weren't seen and stores the version.
+        """
+        with self._lock:
+            self._remove_members(source, self._members.get(source, set()) - keep)
+            self.set_version(source, version)
+
+
+    def set_version(self, source: str, version: str) -> None:
+        with self._lock:
+            self._versions[source] = version
+            self._db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (source, version))
+            self._db.commit()
+
+
+    def drop_source(self, source: str) -> None:
+        with self._lock:
+            self._remove_members(source, set(self._members.get(source, set())))
+            self._members.pop(source, None)
+            self._versions.pop(source, None)
+            self._db.execute("DELETE FROM sources WHERE source = ?", (source,))
+            self._db.commit()
+
+
+    def search(self, query: str, limit: int = 20, kinds: Optional[Set[str]] = None) -> List[LibraryItem]:
+        """
+        Prefix matches first (every query word is a prefix of a word in the item),
+        then fuzzy trigram matches ranked by similarity.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+
+        with self._lock:
+            prefix_hits: Optional[Set[str]] = None
+            for word in words:
+                hits = set()
+                i = bisect.bisect_left(self._tokens, (word, ""))
+                while i < len(self._tokens) and self._tokens[i][0].startswith(word):
+                    hits.add(self._tokens[i][1])
+                    i += 1
+                prefix_hits = hits if prefix_hits is None else prefix_hits & hits
+
+            results = self._rank(prefix_hits or set(), kinds, limit)
+            if len(results) >= limit:
+                return results
+
+            query_grams = set().union(*(trigrams(w) for w in words))
+            shared: Counter = Counter()
+            for gram in query_grams:
+                for uri in self._trigrams.get(gram, ()):
+                    shared[uri] += 1
+
+            fuzzy = []
+            seen = {item.uri for item in results}
+            for uri, count in shared.items():
+                if uri in seen or (kinds is not None and self._items[uri].kind not in kinds):
+                    continue
+                # share of the query covered by the item, shorter items win ties
+                score = count / len(query_grams)
+                if score >= 0.5:
+                    fuzzy.append((-score, len(self._item_trigrams[uri]), uri))
+
+            for _, _, uri in heapq.nsmallest(limit - len(results), fuzzy):
+                results.append(self._items[uri])
+            return results
+
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+    def _rank(self, uris: Set[str], kinds: Optional[Set[str]], limit: int) -> List[LibraryItem]:
+        order = {"playlist": 0, "album": 1, "track": 2}
+        items = (self._items[u] for u in uris)
+        if kinds is not None:
+            items = (i for i in items if i.kind in kinds)
+        # a short prefix can hit most of the library, only order the top
+        return heapq.nsmallest(limit, items, key=lambda i: (order.get(i.kind, 3), len(i.name), i.name))
+
+
+    def _index(self, items: List[LibraryItem]) -> None:
+        tokens = []
+        for item in items:
+            words = set(tokenize(f"{item.name} {item.subtitle}"))
+            tokens.extend((word, item.uri) for word in words)
+
+            grams = set().union(*(trigrams(w) for w in words)) if words else set()
+            self._item_trigrams[item.uri] = grams
+            for gram in grams:
+                self._trigrams.setdefault(gram, set()).add(item.uri)
+
+        if tokens:
+            # two sorted runs, which sort() merges in linear time
+            tokens.sort()
+            self._tokens.extend(tokens)
+            self._tokens.sort()
+
+
+    def _unindex(self, uris: Set[str]) -> None:
+        # one pass over the token list for the whole batch
+        self._tokens = [t for t in self._tokens if t[1] not in uris]
+        for uri in uris:
+            for gram in self._item_trigrams.pop(uri, set()):
+                postings = self._trigrams.get(gram)
+                if postings:
+                    postings.discard(uri)
+                    if not postings:
+                        del self._trigrams[gram]
+
+
+    def _remove_members(self, source: str, uris: Set[str]) -> None:
+        if not uris:
+            return
+        members = self._members.get(source, set())
+        orphans = []
+        for uri in uris:
+            members.discard(uri)
+            self._refcount[uri] -= 1
+            if self._refcount[uri] <= 0:
+                del self._refcount[uri]
+                orphans.append(uri)
+
+        if orphans:
+            self._unindex(set(orphans))
+            for uri in orphans:
+                self._items.pop(uri, None)
+
+        self._db.executemany(
+            "DELETE FROM members WHERE source = ? AND uri = ?", [(source, u) for u in uris]
+        )
+        self._db.executemany("DELETE FROM items WHERE uri = ?", [(u,) for u in orphans])
+        self._db.commit()
+
+
+    def load(self) -> None:
+        """
+        Reads the persisted index. Slow for big libraries, so the indexer does
+        it in its own thread.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+
+    def _load(self) -> None:
+        for uri, kind, name, subtitle in self._db.execute("SELECT uri, kind, name, subtitle FROM items"):
+            self._items[uri] = LibraryItem(uri, kind, name, subtitle)
+        for source, uri in self._db.execute("SELECT source, uri FROM members"):
+            if uri in self._items:
+                self._members.setdefault(source, set()).add(uri)
+                self._refcount[uri] += 1
+        for source, version in self._db.execute("SELECT source, version FROM sources"):
+            self._versions[source] = version
+        self._index(list(self._items.values()))
+
+
+class LibraryIndexer:
+    """
+    Keeps a LibraryIndex in sync from a background thread, page by page.
+    Playlists are only fetched again when their snapshot_id changed.
+    """
+
+    def __init__(
+        self,
+        spotify_service,
+        index: LibraryIndex,
+        on_progress: Optional[Callable[[int], None]] = None,
+        on_error: Optional[Callable[[str], None]] = None,
+        interval: float = 30 * 60,
+        retry_delay: float = 60.0,
+    ) -> None:
+        self.spotify = spotify_service
+        self.index = index
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self._interval = interval
+        self._retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="library-indexer", daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+    def _run(self) -> None:
+        delay = self._retry_delay
+        while not self._stop.is_set():
+            if not self.spotify.wait_logged_in(timeout=1.0):
+                continue
+            try:
+                self.sync()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(f"Library sync failed: {e}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, self._interval)
+                continue
+            delay = self._retry_delay
+            self._stop.wait(self._interval)
+
+
+    def sync(self) -> None:
+        self.index.load()
+        self._sync_saved(SAVED_ALBUMS, "albums")
+        self._sync_saved(SAVED_TRACKS, "tracks")
+        self._sync_playlists()
+
+
+    def _sync_saved(self, source: str, kind: str) -> None:
+        pages = self.spotify.iter_saved(kind)
+        total, first = next(pages, (0, []))
+        version = f"{total}:{first[0]['uri'] if first else ''}"
+        if self.index.version(source) == version:
+            return
+
+        seen = set()
+        for page in itertools.chain([first], (page for _, page in pages)):
+            items = [LibraryItem.from_item(i) for i in page]
+            self.index.add(source, items)
+            seen.update(item.uri for item in items)
+            self._progress()
+        self.index.finish(source, seen, version)
+
+
+    def _sync_playlists(self) -> None:
+        playlists = []
+        for page in self.spotify.iter_user_playlists():
+            page = [p for p in page if p and p.get("uri")]
+            playlists.extend(page)
+            self.index.add(PLAYLISTS, [LibraryItem.from_item(p) for p in page])
+            self._progress()
+
+        listed = {p["uri"] for p in playlists}
+        self.index.finish(PLAYLISTS, listed, str(len(playlists)))
+        for source in self.index.sources():
+            if source.startswith("spotify:playlist:") and source not in listed:
+                self.index.drop_source(source)
+
+        for playlist in playlists:
+            uri, snapshot = playlist["uri"], playlist.get("snapshot_id", "")
+            if self.index.version(uri) == snapshot:
+                continue
+            try:
+                self._sync_playlist(uri, snapshot)
+            except Exception as e:
+                # the old version stays, so the next sync tries it again
+                logger.warning("Skipping playlist %s this sync: %s", uri, e)
+
+
+    def _sync_playlist(self, uri: str, snapshot: str) -> None:
+        seen = set()
+        for page in self.spotify.iter_playlist_tracks(uri):
+            items = [LibraryItem.from_item(t) for t in page if t and t.get("uri") and t.get("type") == "track"]
+            self.index.add(uri, items)
+            seen.update(item.uri for item in items)
+            self._progress()
+        self.index.finish(uri, seen, snapshot)
+
+
+    def _progress(self) -> None:
+        if self.on_progress:
+            self.on_progress(len(self.index))
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.config.paths import get_cache_dir
+
+
+# How long an entry is trusted before it is revalidated. Tracks and albums
+# practically never change, playlists are revalidated cheaply via snapshot_id.
+DEFAULT_TTL = {
+    "track": 7 * 24 * 3600,
+    "album": 7 * 24 * 3600,
+    "playlist": 3600,
+    "device": 600,
+}
+
+
+@dataclass(frozen=True)
+class Metadata:
+    uri: str
+    kind: str  # "track" / "album" / "playlist" / "device"
+    name: str
+    subtitle: str = ""  # artists / owner / device type
+    image_url: str = ""  # largest image
+    thumb_url: str = ""  # smallest image
+    version: str = ""  # playlist snapshot_id, empty for everything else
+    fetched_at: float = 0.0
+    expires_at: float = 0.0
+
+    @property
+    def label(self) -> str:
+        return self.name
+
+    @property
+    def tooltip(self) -> str:
+        return f"{self.name}  -  {self.subtitle}" if self.subtitle else self.name
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) < self.expires_at
+
+    @staticmethod
+    def from_item(item: dict, ttl: Optional[Dict[str, float]] = None) -> "Metadata":
+        """
+        Builds metadata from a Spotify track, album or playlist object.
+        """
+        kind = item.get("type", "")
+        if kind == "track":
+            subtitle = ", ".join(a.get("name", "") for a in item.get("artists", []))
+            images = item.get("album", {}).get("images") or []
+        elif kind == "album":
+            subtitle = ", ".join(a.get("name", "") for a in item.get("artists", []))
+            images = item.get("images") or []
+        elif kind == "playlist":
+            subtitle = (item.get("owner") or {}).get("display_name") or ""
+            images = item.get("images") or []
+        else:
+            raise ValueError(f"Unsupported item type '{kind}'")
+
+        now = time.time()
+        return Metadata(
+            uri=item["uri"],
+            kind=kind,
+            name=item.get("name", ""),
+            subtitle=subtitle,
+            image_url=images[0]["url"] if images else "",
+            thumb_url=images[-1]["url"] if images else "",
+            version=item.get("snapshot_id") or "",
+            fetched_at=now,
+            expires_at=now + (ttl or DEFAULT_TTL).get(kind, 3600),
+        )
+
+
+class MetadataCache:
+    """
+    Metadata of tracks, albums, playlists and devices, in SQLite and mirrored in memory.
+    get() also returns stale entries, resolve() revalidates them.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: Optional[Dict[str, float]] = None,
+        max_entries: int = 5000,
+    ) -> None:
+        self._path = Path(path) if path else get_cache_dir() / "metadata.sqlite"
+        self._ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(str(self._path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS metadata ("
+            " uri TEXT PRIMARY KEY, kind TEXT, name TEXT, subtitle TEXT,"
+            " image_url TEXT, thumb_url TEXT, version TEXT,"
+            " fetched_at REAL, expires_at REAL)"
+        )
+        self._db.commit()
+
+        rows = self._db.execute(
+            "SELECT uri, kind, name, subtitle, image_url, thumb_url, version, fetched_at, expires_at FROM metadata"
+        ).fetchall()
+        self._entries: Dict[str, Metadata] = {row[0]: Metadata(*row) for row in rows}
+
+
+    def get(self, uri: str) -> Optional[Metadata]:
+        """
+        Returns the cached entry, fresh or stale. Never does network calls.
+        """
+        return self._entries.get(uri)
+
+
+    def put(self, meta: Metadata) -> None:
+        with self._lock:
+            self._entries[meta.uri] = meta
+            self._db.execute(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (meta.uri, meta.kind, meta.name, meta.subtitle, meta.image_url,
+                 meta.thumb_url, meta.version, meta.fetched_at, meta.expires_at),
+            )
+            self._db.commit()
+
+
+    def put_item(self, item: dict) -> Metadata:
+        """
+        Stores a Spotify object we already have in hand (e.g. the playing track).
+        """
+        meta = Metadata.from_item(item, self._ttl)
+        self.put(meta)
+        return meta
+
+
+    def put_device(self, device_id: str, name: str, device_type: str) -> Metadata:
+        now = time.time()
+        meta = Metadata(
+            uri=f"device:{device_id}",
+            kind="device",
+            name=name,
+            subtitle=device_type,
+            fetched_at=now,
+            expires_at=now + self._ttl["device"],
+        )
+        self.put(meta)
+        return meta
+
+
+    def resolve(self, spotify, uri: str) -> Optional[Metadata]:
+        """
+        Returns fresh metadata for uri, fetching or revalidating it if needed.
+        Playlists are revalidated by comparing snapshot_id, which is far cheaper
+        than fetching the whole playlist again. Falls back to the stale entry
+        if the network call fails.
+        """
+        cached = self.get(uri)
+        if cached and cached.is_fresh():
+            return cached
+
+        try:
+            if cached and cached.kind == "playlist" and cached.version:
+                if spotify.get_playlist_snapshot_id(uri) == cached.version:
+                    now = time.time()
+                    meta = replace(cached, fetched_at=now, expires_at=now + self._ttl["playlist"])
+                    self.put(meta)
+                    return meta
+            return self.put_item(spotify.get_item(uri))
+        except Exception:
+            if cached:
+                return cached
+            raise
+
+
+    def evict_expired(self, grace: float = 30 * 24 * 3600) -> int:
+        """
+        Drops entries that expired more than grace seconds ago and trims the
+        cache to max_entries (oldest fetched first). Returns number of evicted entries.
+        """
+        cutoff = time.time() - grace
+        with self._lock:
+            doomed = [uri for uri, meta in self._entries.items() if meta.expires_at < cutoff]
+            overflow = len(self._entries) - len(doomed) - self._max_entries
+            if overflow > 0:
+                alive = sorted(
+                    (meta for meta in self._entries.values() if meta.expires_at >= cutoff),
+                    key=lambda meta: meta.fetched_at,
+                )
+                doomed.extend(meta.uri for meta in alive[:overflow])
+
+            for uri in doomed:
+                del self._entries[uri]
+            self._db.executemany("DELETE FROM metadata WHERE uri = ?", [(uri,) for uri in doomed])
+            self._db.commit()
+        return len(doomed)
+
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
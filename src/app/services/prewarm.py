@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .metadata_cache import MetadataCache
+from .registry import ALL_ACCOUNTS, SpotifyServiceRegistry
+
+log = logging.getLogger(__name__)
+
+
+class SlotPrewarmer:
+    """
+    Keeps token, device, metadata and cover of the bound slots warm, so a
+    press is a single start_playback call.
+      - every device_interval: token and active device of each bound account
+      - every interval: metadata and cover of the most used slots
+    """
+
+    def __init__(
+        self,
+        accounts: SpotifyServiceRegistry,
+        bindings: Callable[[], Dict[int, object]],
+        metadata: Optional[MetadataCache] = None,
+        prefetch_cover: Optional[Callable[[str], None]] = None,
+        interval: float = 20.0,
+        device_interval: float = 4.0,
+        max_slots_per_cycle: int = 4,
+        half_life: float = 24 * 3600,
+    ) -> None:
+        self._accounts = accounts
+        self._bindings = bindings
+        self._metadata = metadata
+        self._prefetch_cover = prefetch_cover
+        self._interval = interval
+        self._device_interval = device_interval
+        self._max_slots = max_slots_per_cycle
+        self._half_life = half_life
+
+        self._lock = threading.Lock()
+        self._usage: Dict[int, float] = {}  # slot_id -> decayed press count
+        self._last_used: Dict[int, float] = {}
+        self._usage_at = time.time()
+        self._covers_sent: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+
+    def note_used(self, slot_id: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._decay(now)
+            self._usage[slot_id] = self._usage.get(slot_id, 0.0) + 1.0
+            self._last_used[slot_id] = now
+
+
+    def ranked_slots(self) -> List[int]:
+        now = time.time()
+        with self._lock:
+            self._decay(now)
+
+            def score(slot_id: int) -> float:
+                # a press in the last few minutes weighs as much as a handful of older ones
+                recent = self._last_used.get(slot_id)
+                recency = 5.0 * math.exp(-(now - recent) / 600) if recent else 0.0
+                return self._usage.get(slot_id, 0.0) + recency
+
+            return sorted(self._bindings(), key=lambda s: (-score(s), s))
+
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="slot-prewarm", daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+    def warm_once(self) -> None:
+        self.warm_accounts()
+        self.warm_slots()
+
+
+    def warm_accounts(self) -> None:
+        # on the account workers, queued behind key presses like any other call
+        for account in self._target_accounts(self._bindings()):
+            try:
+                self._accounts.run(account, self._warm_account)
+            except Exception as e:
+                log.debug("prewarm account failed", extra={"account": account, "error": str(e)})
+
+
+    def warm_slots(self) -> None:
+        if not self._metadata:
+            return
+        bindings = self._bindings()
+        ranked = self.ranked_slots()
+        for slot_id in ranked[:self._max_slots]:
+            binding = bindings.get(slot_id)
+            if binding is None:
+                continue
+            account = None if binding.account in (None, ALL_ACCOUNTS) else binding.account
+            uri = binding.uri.split(",")[0].strip()
+            try:
+                [meta] = self._accounts.run(account, lambda svc: self._metadata.resolve(svc, uri)).values()
+            except Exception as e:
+                log.debug("prewarm slot failed", extra={"slot_id": slot_id, "error": str(e)})
+                continue
+            if meta and meta.image_url and self._prefetch_cover:
+                self._prefetch(meta.image_url)
+
+
+    def _warm_account(self, svc) -> None:
+        svc.ensure_fresh_token()
+        # the device has to outlive the next cycle, accounts the poll keeps fresh cost nothing
+        svc.refresh_device(min_ttl=self._device_interval)
+
+
+    def _prefetch(self, url: str) -> None:
+        # the disk cache keeps it, asking once an hour is plenty
+        now = time.monotonic()
+        if now - self._covers_sent.get(url, -math.inf) < 3600:
+            return
+        self._covers_sent[url] = now
+        self._prefetch_cover(url)
+
+
+    def _target_accounts(self, bindings: Dict[int, object]) -> List[str]:
+        names = set()
+        for binding in bindings.values():
+            try:
+                names.update(self._accounts.resolve(binding.account))
+            except KeyError:
+                pass
+        return sorted(names)
+
+
+    def _decay(self, now: float) -> None:
+        factor = 0.5 ** ((now - self._usage_at) / self._half_life)
+        self._usage_at = now
+        for slot_id in self._usage:
+            self._usage[slot_id] *= factor
+
+
+    def _run(self) -> None:
+        slots_due = 0.0
+        while not self._stop.is_set():
+            try:
+                self.warm_accounts()
+                if time.monotonic() >= slots_due:
+                    slots_due = time.monotonic() + self._interval
+                    self.warm_slots()
+            except Exception as e:
+                log.warning("Slot prewarm cycle failed: %s", e)
+            self._stop.wait(self._device_interval)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from .spotify_client import SpotifyService
+
+T = TypeVar("T")
+
+log = logging.getLogger(__name__)
+
+ALL_ACCOUNTS = "*"
+
+
+class AccountsError(RuntimeError):
+    """Raised when a fan-out call fails on one or more accounts."""
+
+    def __init__(self, errors: Dict[str, BaseException], total: int) -> None:
+        self.errors = errors
+        failed = ", ".join(f"{name or 'default'}: {e}" for name, e in errors.items())
+        super().__init__(f"{len(errors)}/{total} accounts failed ({failed})")
+
+
+class SpotifyServiceRegistry:
+    """
+    One SpotifyService per account / zone, each with its own worker thread:
+    calls to one account keep their order, "*" fans out to all in parallel.
+    """
+
+    def __init__(self, default: Optional[str] = None) -> None:
+        self._default = default
+        self._services: Dict[str, SpotifyService] = {}
+        self._workers: Dict[str, ThreadPoolExecutor] = {}
+        self._stop = threading.Event()
+
+
+    @property
+    def default(self) -> Optional[str]:
+        return self._default
+
+
+    def add(self, name: str, service: SpotifyService) -> None:
+        if name == ALL_ACCOUNTS:
+            raise ValueError(f"'{ALL_ACCOUNTS}' is reserved for fan-out.")
+        if name in self._services:
+            raise ValueError(f"Account '{name}' is already registered.")
+
+        self._services[name] = service
+        self._workers[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"spotify-{name or 'default'}")
+        if self._default is None:  # "" is a real account name, the usual default
+            self._default = name
+
+
+    def get(self, name: Optional[str] = None) -> SpotifyService:
+        name = self._default if name is None else name
+        try:
+            return self._services[name]
+        except KeyError:
+            raise KeyError(f"Unknown Spotify account '{name}'") from None
+
+
+    def names(self) -> List[str]:
+        return list(self._services)
+
+
+    def resolve(self, target: Optional[str] = None) -> List[str]:
+        """
+        Turn a binding target into account names. None means the default
+        account and "*" means every registered account.
+        """
+        if target == ALL_ACCOUNTS:
+            return self.names()
+        name = self._default if target is None else target
+        if name not in self._services:
+            raise KeyError(f"Unknown Spotify account '{name}'")
+        return [name]
+
+
+    def submit(self, target: Optional[str], fn: Callable[[SpotifyService], T]) -> Dict[str, Future]:
+        """
+        Queue fn on the worker of every targeted account and return the futures.
+        """
+        return {
+            name: self._workers[name].submit(fn, self._services[name])
+            for name in self.resolve(target)
+        }
+
+
+    def run(self, target: Optional[str], fn: Callable[[SpotifyService], T]) -> Dict[str, T]:
+        """
+        Run fn against the targeted accounts in parallel and wait for all of them.
+        A single account re-raises its own error, fan-out raises AccountsError.
+        """
+        futures = self.submit(target, fn)
+
+        results: Dict[str, T] = {}
+        errors: Dict[str, BaseException] = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+
+        if errors:
+            if len(futures) == 1:
+                raise next(iter(errors.values()))
+            raise AccountsError(errors, len(futures))
+        return results
+
+
+    def login(
+        self,
+        on_login_url: Optional[Callable[[str, str], None]] = None,
+        on_logged_in: Optional[Callable[[str], None]] = None,
+        retry_after: float = 60.0,
+    ) -> threading.Thread:
+        """
+        Logs in the accounts one at a time in a background thread (they share the redirect port),
+        retrying failures after retry_after. on_logged_in(account) runs for every account with a token.
+        """
+        def run():
+            pending = list(self._services)
+            while pending and not self._stop.is_set():
+                for name in list(pending):
+                    url_fn = (lambda url, name=name: on_login_url(name, url)) if on_login_url else None
+                    try:
+                        self._services[name].ensure_automatic_logging(on_login_url=url_fn)
+                    except Exception as e:
+                        log.error("Login failed for account '%s': %s", name or "default", e)
+                        continue
+                    pending.remove(name)
+                    if on_logged_in:
+                        on_logged_in(name)
+                if pending:
+                    self._stop.wait(retry_after)
+            if not pending:
+                self._warn_shared_users()
+
+        thread = threading.Thread(target=run, name="spotify-login", daemon=True)
+        thread.start()
+        return thread
+
+
+    def _warn_shared_users(self) -> None:
+        if len(self._services) < 2:
+            return
+        users: Dict[str, str] = {}
+        for name in self._services:
+            try:
+                [user_id] = self.run(name, lambda svc: svc.get_user_id()).values()
+            except Exception as e:
+                log.debug("user lookup failed", extra={"account": name, "error": str(e)})
+                continue
+            if user_id in users:
+                log.error(
+                    "Accounts '%s' and '%s' are logged in as the same Spotify user '%s'. "
+                    "Log one of them out and pick the other user on the login page.",
+                    users[user_id] or "default", name or "default", user_id,
+                )
+            users.setdefault(user_id, name)
+
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        for worker in self._workers.values():
+            worker.shutdown(wait=True)
+        for service in self._services.values():
+            service.close()
@@ -2,18 +2,40 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, List
+from typing import Iterator, Optional, List, Tuple
 
 import threading
+import time
 import webbrowser
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import urlparse, parse_qs
 
+import requests
 import spotipy
+from requests.adapters import HTTPAdapter
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyPKCE
 from platformdirs import user_cache_dir
 
 
+class SpotifyUnavailableError(RuntimeError):
+    """Spotify can't be reached right now (no network, no device ...), retrying later may work."""
+
+
+def is_unavailable_error(e: BaseException) -> bool:
+    """
+    True for errors that go away by themselves: network problems, no active
+    device, rate limiting and server errors. False for e.g. bad URIs or a
+    missing login, which need the user.
+    """
+    if isinstance(e, (SpotifyUnavailableError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(e, SpotifyException):
+        status = e.http_status or 0
+        return status == 429 or status >= 500 or e.reason == "NO_ACTIVE_DEVICE"
+    return False
+
+
 @dataclass(frozen=True)
 class SpotifyDevice:
     id: str
@@ -47,18 +69,34 @@ class SpotifyService:
         client_id: str,
         redirect_uri: str,
         scope: str,
-        app_name: str = "MacroKeyboardSpotifyInterface"
+        app_name: str = "MacroKeyboardSpotifyInterface",
+        account: str = "",
+        pool_size: int = 4,
+        api_prefix: Optional[str] = None,
+        device_ttl: float = 5.0,
+        show_dialog: bool = False,
+        cache_dir: Optional[Path] = None,
+        token_url: Optional[str] = None,
     ) -> None:
 
         self._client_id = client_id
+        self._account = account
         self._redirect_uri = redirect_uri
 
         # normalize scope string (no commas)
         self._scope = " ".join([s.strip() for s in scope.replace(",", " ").split()])
 
-        cache_dir = Path(user_cache_dir(app_name))
+        cache_dir = Path(cache_dir) if cache_dir else Path(user_cache_dir(app_name))
         cache_dir.mkdir(parents=True, exist_ok=True)
-        self._cache_path = str(cache_dir / "spotify_token_cache")
+        # every account gets its own token cache, the default account keeps the old file name
+        cache_name = f"spotify_token_cache_{account}" if account else "spotify_token_cache"
+        self._cache_path = str(cache_dir / cache_name)
+
+        # one connection pool per account, shared by auth and api calls
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
 
         self._auth = SpotifyPKCE(
             client_id=self._client_id,
@@ -66,9 +104,27 @@ class SpotifyService:
             scope=self._scope,
             open_browser=False, # let GUI handle browser opening
             cache_path=self._cache_path,
+            requests_session=self._session,
         )
+        if token_url:
+            self._auth.OAUTH_TOKEN_URL = token_url  # a local fake in soak tests, like api_prefix
     
         self._sp: Optional[spotipy.Spotify] = None
+        self._api_prefix = api_prefix  # e.g. a local fake api in soak tests
+        self._login_lock = threading.Lock()
+        self._token_lock = threading.Lock()  # the indexer and queue panel call from their own threads
+        self._access_token = ""
+        self._token_expires_at = 0.0
+        self._device_ttl = device_ttl
+        self._device: Optional[Tuple[str, float]] = None  # (active device id, monotonic expiry), from the player state
+        self._show_dialog = show_dialog
+        self._logged_in = threading.Event()
+        self._login_done: Optional[threading.Event] = None  # the redirect server waiting, if any
+
+
+    @property
+    def account(self) -> str:
+        return self._account
 
 
     @property
@@ -77,17 +133,31 @@ class SpotifyService:
         return self._cache_path
     
 
-    def ensure_automatic_logging(self, host="127.0.0.1", port=8888, path="/callback"):
+    def ensure_automatic_logging(self, host="127.0.0.1", port=8888, path="/callback", on_login_url=None):
         """
         Upons up the redirect url, and fetches the code and inputs it automatically. The user
         hereby only needs to login in the browser (or press agree).
         It does this with a simple HTTP server that listens for the redirect.
+        on_login_url replaces opening the browser, e.g. to log the url on a headless box.
+        Blocks up to 180 s waiting for the browser, so never call it on the GUI thread.
         """
         if self._auth.get_cached_token():
+            self._ensure_client()
             return
 
+        # only one login server at a time, a second caller just returns
+        if not self._login_lock.acquire(blocking=False):
+            return
+        try:
+            self._login_with_server(host, port, path, on_login_url)
+        finally:
+            self._login_lock.release()
+
+
+    def _login_with_server(self, host, port, path, on_login_url) -> None:
         code_holder = {"code": None}
         done = threading.Event()
+        self._login_done = done
 
         class Handler(BaseHTTPRequestHandler):
             def do_GET(self):
@@ -113,19 +183,28 @@ class SpotifyService:
         t.start()
 
         # Open login URL in browser
-        login_url = self._auth.get_authorize_url()
-        webbrowser.open(login_url)
+        login_url = self._authorize_url()
+        if on_login_url:
+            on_login_url(login_url)
+        else:
+            webbrowser.open(login_url)
 
         # Wait for callback
         done.wait(timeout=180)
+        self._login_done = None
         server.shutdown()
+        server.server_close()  # release the listening socket, shutdown() alone keeps it
+        t.join(timeout=1)
 
         code = code_holder["code"]
+        if not code and self._auth.get_cached_token():
+            return  # finished with finish_login(), e.g. from another machine
         if not code:
             raise RuntimeError("Login timeout eller ingen code modtaget")
 
         # Exchange the code to token (written in cache_path)
         self._auth.get_access_token(code)
+        self._use_token(self._auth.get_cached_token())
 
 
     def get_logged_in_state(self) -> LoginState: 
@@ -139,7 +218,7 @@ class SpotifyService:
     
         return LoginState(
             is_logged_in=False,
-            login_url=self._auth.get_authorize_url(),
+            login_url=self._authorize_url(),
             reason="No cached token found."
         )
 
@@ -158,9 +237,10 @@ class SpotifyService:
             raise ValueError("Could not parse authorization code from redirected URL.")
         
         token_info = self._auth.get_access_token(code)
-        access_token = token_info["access_token"] if isinstance(token_info, dict) else token_info
-        
-        self._sp = spotipy.Spotify(auth=access_token)
+        self._use_token(token_info)
+        done = self._login_done
+        if done:
+            done.set()  # no need to wait for the redirect anymore
 
 
     def list_devices(self) -> List[SpotifyDevice]:
@@ -203,7 +283,7 @@ class SpotifyService:
         """
         Start playback of the given track URI on an available device
         """
-        self.play_track(self._pick_device_id(), track_uri)
+        self._on_device(lambda device_id: self.play_track(device_id, track_uri))
 
 
     def play_playlist(self, device_id: str, playlist_uri: str) -> None:
@@ -218,7 +298,7 @@ class SpotifyService:
         """
         Start playback of the given playlist URI on an available device.
         """
-        self.play_playlist(self._pick_device_id(), playlist_uri)
+        self._on_device(lambda device_id: self.play_playlist(device_id, playlist_uri))
 
 
     def play_uris(self, uris: List[str], device_id: str) -> None:
@@ -233,7 +313,7 @@ class SpotifyService:
         """
         Start playback of the given list of URIs on an available device.
         """
-        self.play_uris(self._pick_device_id(), uris)
+        self._on_device(lambda device_id: self.play_uris(uris, device_id))
 
 
     def pause(self, device_id: Optional[str] = None) -> None:
@@ -245,7 +325,7 @@ class SpotifyService:
 
 
     def pause_auto(self) -> None:
-        self.pause(self._pick_device_id())
+        self._on_device(self.pause)
 
 
     def resume(self, device_id: Optional[str] = None) -> None:
@@ -257,7 +337,7 @@ class SpotifyService:
     
 
     def resume_auto(self) -> None:
-        self.resume(self._pick_device_id())
+        self._on_device(self.resume)
 
 
     def toggle_pause_resume(self, device_id: Optional[str] = None) -> None:
@@ -275,7 +355,7 @@ class SpotifyService:
 
 
     def toggle_pause_resume_auto(self) -> None:
-        self.toggle_pause_resume(self._pick_device_id())
+        self._on_device(self.toggle_pause_resume)
 
 
     def next(self, device_id: Optional[str] = None) -> None:
@@ -287,7 +367,7 @@ class SpotifyService:
 
 
     def next_auto(self) -> None:
-        self.next(self._pick_device_id())
+        self._on_device(self.next)
 
 
     def previous(self, device_id: Optional[str] = None) -> None:
@@ -298,8 +378,8 @@ class SpotifyService:
         sp.previous_track(device_id=device_id)
 
 
-    def previou_auto(self) -> None:
-        self.previous(self._pick_device_id())
+    def previous_auto(self) -> None:
+        self._on_device(self.previous)
 
 
     def logout(self) -> None:
@@ -307,19 +387,52 @@ class SpotifyService:
         Logout by deleting the cached token.
         """
         self._sp = None
+        self._logged_in.clear()
         try:
             Path(self._cache_path).unlink(missing_ok=True)
         except Exception as e:
             raise RuntimeError(f"Failed to delete cache file: {e}") from e
 
 
-    def get_song_info(self) -> Optional[dict]:
+    def wait_logged_in(self, timeout: Optional[float] = None) -> bool:
         """
-        Get information about the currently playing song.
+        Wait until this account has a token. True if it has one.
+        """
+        return self._logged_in.wait(timeout)
+
+
+    def get_user_id(self) -> str:
+        """
+        The Spotify user id this account is logged in as.
+        """
+        sp = self._ensure_client()
+        return (sp.me() or {}).get("id", "")
+
+
+    def close(self) -> None:
+        """
+        Close the connection pool of this account.
+        """
+        self._session.close()
+
+
+    def get_playback(self) -> Optional[dict]:
+        """
+        Get the full playback state (item, device, progress, is_playing), None if nothing plays.
         """
         sp = self._ensure_client()
         playback = sp.current_playback()
-        if not playback or not isinstance(playback, dict):
+        playback = playback if isinstance(playback, dict) else None
+        self._note_active_device(playback)
+        return playback
+
+
+    def get_song_info(self) -> Optional[dict]:
+        """
+        Get information about the currently playing song.
+        """
+        playback = self.get_playback()
+        if not playback:
             return None
         item = playback.get("item")
         if not item or not isinstance(item, dict):
@@ -327,26 +440,202 @@ class SpotifyService:
         return item
 
 
+    def get_item(self, uri: str) -> dict:
+        """
+        Get the track, album or playlist object for the given URI.
+        """
+        sp = self._ensure_client()
+        kind = uri.split(":")[1] if uri.count(":") >= 2 else ""
+        if kind == "track":
+            return sp.track(uri)
+        if kind == "album":
+            return sp.album(uri)
+        if kind == "playlist":
+            # skip the track listing, we only need the header
+            return sp.playlist(uri, fields="uri,type,name,owner(display_name),images,snapshot_id")
+        raise ValueError(f"Unsupported Spotify URI: {uri}")
+
+
+    def get_playlist_snapshot_id(self, playlist_uri: str) -> str:
+        """
+        Get only the snapshot_id of a playlist. Changes whenever the playlist changes.
+        """
+        sp = self._ensure_client()
+        return sp.playlist(playlist_uri, fields="snapshot_id").get("snapshot_id", "")
+
+
+    def iter_user_playlists(self) -> Iterator[List[dict]]:
+        """
+        Yield the current user's playlists page by page.
+        """
+        sp = self._ensure_client()
+        page = sp.current_user_playlists(limit=50)
+        while page:
+            yield page.get("items", [])
+            page = sp.next(page) if page.get("next") else None
+
+
+    def iter_playlist_tracks(self, playlist_uri: str) -> Iterator[List[dict]]:
+        """
+        Yield the tracks of a playlist page by page (only the fields the index needs).
+        """
+        sp = self._ensure_client()
+        page = sp.playlist_items(
+            playlist_uri,
+            fields="items(track(uri,type,name,artists(name))),next",
+            limit=100,
+            additional_types=("track",),
+        )
+        while page:
+            yield [i.get("track") for i in page.get("items", []) if i.get("track")]
+            page = sp.next(page) if page.get("next") else None
+
+
+    def iter_saved(self, kind: str) -> Iterator[Tuple[int, List[dict]]]:
+        """
+        Yield (total, items) pages of the user's saved "tracks" or "albums", newest first.
+        """
+        sp = self._ensure_client()
+        fetch = sp.current_user_saved_tracks if kind == "tracks" else sp.current_user_saved_albums
+        key = "track" if kind == "tracks" else "album"
+        page = fetch(limit=50)
+        while page:
+            yield page.get("total", 0), [i.get(key) for i in page.get("items", []) if i.get(key)]
+            page = sp.next(page) if page.get("next") else None
+
+
+    def get_queue(self) -> List[dict]:
+        """
+        The tracks (and episodes) up next. Spotify returns the whole visible queue
+        in one response, there is no paging.
+        """
+        sp = self._ensure_client()
+        queue = sp.queue() or {}
+        return [item for item in queue.get("queue", []) if item]
+
+
+    def get_recently_played(self, before: Optional[str] = None, limit: int = 50) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of play history, newest first, as (items, cursor for the next older page).
+        Items are {"track": ..., "played_at": ...}.
+        """
+        sp = self._ensure_client()
+        page = sp.current_user_recently_played(limit=limit, before=before) or {}
+        items = [i for i in page.get("items", []) if i.get("track")]
+        cursor = (page.get("cursors") or {}).get("before") if page.get("next") else None
+        return items, cursor
+
+
     def _ensure_client(self) -> spotipy.Spotify:
         """
         Ensure that the Spotify client is initialized and has a valid token.
         Uses cached token and refreshes if necessary.
         """
-        if self._sp is not None:
+        if self._sp is not None and time.time() < self._token_expires_at - 60:
             return self._sp
 
-        token_info = self._auth.get_cached_token()
-        if not token_info:
-            raise RuntimeError("User is not logged in. Call get_login_state() and finish_login() first.")
-        
-        access_token = token_info["access_token"] if isinstance(token_info, dict) else token_info
-        self._sp = spotipy.Spotify(auth=access_token)
-        return self._sp
+        with self._token_lock:
+            # refreshes the token if it is about to expire
+            token_info = self._auth.get_cached_token()
+            if not token_info:
+                raise RuntimeError("User is not logged in. Call get_login_state() and finish_login() first.")
+
+            self._use_token(token_info)
+            return self._sp
+
+
+    def ensure_fresh_token(self, margin: float = 300) -> None:
+        """
+        Refresh the access token ahead of time, so a key press never waits for
+        the token endpoint. Does nothing while the token has more than margin
+        seconds left.
+        """
+        if self._sp is not None and time.time() < self._token_expires_at - margin:
+            return
+        with self._token_lock:
+            token_info = self._auth.get_cached_token()
+            if not token_info:
+                return
+            if isinstance(token_info, dict) and time.time() > token_info.get("expires_at", 0) - margin:
+                token_info = self._auth.refresh_access_token(token_info["refresh_token"])
+            self._use_token(token_info)
+
+
+    def refresh_device(self, min_ttl: float = 0.0) -> str:
+        """
+        Look up the active device from the player state, remembered for
+        device_ttl seconds (empty if nothing is active). Also keeps a
+        connection of the pool warm. Skipped while the remembered device
+        is good for min_ttl more seconds, e.g. because the poll just saw it.
+        """
+        device = self._device
+        if device is None or device[1] - time.monotonic() <= min_ttl:
+            self.get_playback()
+            device = self._device
+        return device[0] if device else ""
+
+
+    def _authorize_url(self) -> str:
+        url = self._auth.get_authorize_url()
+        if self._show_dialog:
+            # SpotifyPKCE has no show_dialog. Without it the browser silently approves
+            # whoever is signed in already, so every zone would get the same user
+            url += "&show_dialog=true"
+        return url
+
+
+    def _use_token(self, token_info) -> None:
+        if isinstance(token_info, dict):
+            access_token = token_info["access_token"]
+            self._token_expires_at = float(token_info.get("expires_at", 0))
+        else:
+            access_token = token_info
+            self._token_expires_at = time.time() + 3600
+        if self._sp is None:
+            self._sp = self._make_client(access_token)
+        elif access_token != self._access_token:
+            self._sp.set_auth(access_token)
+        self._access_token = access_token
+        self._logged_in.set()
+
+
+    def _make_client(self, access_token: str) -> spotipy.Spotify:
+        sp = spotipy.Spotify(auth=access_token, requests_session=self._session)
+        if self._api_prefix:
+            sp.prefix = self._api_prefix
+        return sp
     
 
+    def _note_active_device(self, playback: Optional[dict]) -> None:
+        # every poll tells us the active device for free, so a switch made in
+        # the Spotify app is picked up before the next key press
+        device_id = ((playback or {}).get("device") or {}).get("id")
+        if device_id:
+            self._device = (device_id, time.monotonic() + self._device_ttl)
+
+
     def _pick_device_id(self) -> str:
+        """
+        The active device as seen by a recent poll, else a fresh device lookup
+        (active device first), like without the cache.
+        """
+        device = self._device
+        if device and time.monotonic() < device[1]:
+            return device[0]
         devices = self.list_devices()
         if not devices:
-            raise RuntimeError("No Spotify devices available")
+            raise SpotifyUnavailableError("No Spotify devices available")
         active = next((d for d in devices if d.is_active), None)
-        return (active or devices[0]).id
\ No newline at end of file
+        return (active or devices[0]).id
+
+
+    def _on_device(self, fn) -> None:
+        """
+        Run fn(device_id) on the cached device. If it fails the device may be
+        gone, so it is looked up again on the next call.
+        """
+        try:
+            fn(self._pick_device_id())
+        except Exception:
+            self._device = None
+            raise
\ No newline at end of file
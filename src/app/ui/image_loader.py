@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from pathlib import Path
 from typing import Optional
 
@@ -14,18 +15,21 @@ from PySide6.QtNetwork import (
 
 from platformdirs import user_cache_dir
 
+log = logging.getLogger(__name__)
+
 
 class ImageLoader(QObject):
     loaded = Signal(str, QPixmap)   # (url, pixmap)
     failed = Signal(str, str)       # (url, error)
+    _load_requested = Signal(str)   # lets other threads ask for a load
 
-    def __init__(self, parent: Optional[QObject] = None, max_cache_mb: int = 100):
+    def __init__(self, parent: Optional[QObject] = None, max_cache_mb: int = 100, cache_dir: Optional[Path] = None):
         super().__init__(parent)
 
         self.nam = QNetworkAccessManager(self)
 
         # Disk cache med max størrelse (evicter automatisk)
-        cache_dir = Path(user_cache_dir("macro-spotify-app")) / "image_cache"
+        cache_dir = Path(cache_dir) if cache_dir else Path(user_cache_dir("macro-spotify-app")) / "image_cache"
         cache_dir.mkdir(parents=True, exist_ok=True)
 
         disk_cache = QNetworkDiskCache(self)
@@ -33,12 +37,21 @@ class ImageLoader(QObject):
         disk_cache.setMaximumCacheSize(max_cache_mb * 1024 * 1024)  # bytes
 
         self.nam.setCache(disk_cache)
+        self.nam.finished.connect(self._on_finished)
+        self._in_flight = set()
+        self._load_requested.connect(self.load)
+
+    def queue_load(self, url: str) -> None:
+        """Same as load(), but safe to call from any thread."""
+        self._load_requested.emit(url)
 
     def load(self, url: str) -> None:
         qurl = QUrl(url)
         if not qurl.isValid() or qurl.scheme() not in ("http", "https"):
             self.failed.emit(url, "Invalid URL")
             return
+        if url in self._in_flight:
+            return  # already on its way, loaded will fire once for both
 
         req = QNetworkRequest(qurl)
 
@@ -51,29 +64,33 @@ class ImageLoader(QObject):
 
         req.setRawHeader(b"User-Agent", b"Mozilla/5.0")
 
-        reply = self.nam.get(req)
+        # the original string, loaded/failed must emit exactly what was asked for
+        req.setAttribute(QNetworkRequest.User, url)
 
-        def on_error(e):
-            print("Qt network error enum:", int(e), "->", reply.errorString())
+        # one finished handler on the manager instead of closures per reply
+        self._in_flight.add(url)
+        self.nam.get(req)
 
-        def on_finished():
+    def _on_finished(self, reply: QNetworkReply) -> None:
+        url = reply.request().attribute(QNetworkRequest.User)
+        self._in_flight.discard(url)
+
+        if log.isEnabledFor(logging.DEBUG):
             status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
             redir = reply.attribute(QNetworkRequest.RedirectionTargetAttribute)
-            print("HTTP status:", status, "redir:", redir)
-
-            if reply.error() != QNetworkReply.NoError:
-                self.failed.emit(url, reply.errorString())
-                reply.deleteLater()
-                return
-
-            data = reply.readAll()
-            pix = QPixmap()
-            if not pix.loadFromData(bytes(data)):
-                self.failed.emit(url, "Could not decode image data")
-            else:
-                self.loaded.emit(url, pix)
+            log.debug("image response", extra={"url": url, "status": status, "redirect": str(redir or "")})
 
+        if reply.error() != QNetworkReply.NoError:
+            log.debug("image request error", extra={"url": url, "qt_error": int(reply.error()), "error": reply.errorString()})
+            self.failed.emit(url, reply.errorString())
             reply.deleteLater()
+            return
+
+        data = reply.readAll()
+        pix = QPixmap()
+        if not pix.loadFromData(bytes(data)):
+            self.failed.emit(url, "Could not decode image data")
+        else:
+            self.loaded.emit(url, pix)
 
-        reply.errorOccurred.connect(on_error)
-        reply.finished.connect(on_finished)
\ No newline at end of file
+        reply.deleteLater()
@@ -7,6 +7,9 @@ from app.core.actions import ActionEvent, ActionKind
 
 class MainWindow(QMainWindow):
     action_requested = Signal(object)  # UI -> controller
+    _slot_labels_changed = Signal(object)  # lets worker threads update slot buttons
+    _status_changed = Signal(str)  # set_status / set_error are called from input and worker threads
+    _error_changed = Signal(str)
 
     def __init__(self):
         super().__init__()
@@ -60,22 +63,48 @@ class MainWindow(QMainWindow):
         buttons_layout.addWidget(btn_next)
         buttons_layout.setAlignment(Qt.AlignCenter)
 
+        self.slots_layout = QHBoxLayout()
+        self.slots_layout.setSpacing(4)
+        self._slot_buttons = {}
+        self._slot_labels_changed.connect(self._apply_slot_labels)
+        self._status_changed.connect(self.status.setText)
+        self._error_changed.connect(self.error.setText)
+
         panel_layout.addWidget(self.status)
         panel_layout.addWidget(self.cover, alignment=Qt.AlignCenter)
         panel_layout.addLayout(buttons_layout)
+        panel_layout.addLayout(self.slots_layout)
         outer_layout.addWidget(panel)
         outer_layout.addStretch(1)
+        self._outer_layout = outer_layout
 
         self.setCentralWidget(root)
         self._cover_pix = QPixmap()
 
 
     def set_status(self, text: str) -> None:
-        self.status.setText(f"{text}")
+        """Safe to call from any thread."""
+        self._status_changed.emit(f"{text}")
 
 
     def set_error(self, text: str) -> None:
-        self.error.setText(text)
+        """Safe to call from any thread."""
+        self._error_changed.emit(text)
+
+
+    def set_slot_labels(self, labels: dict) -> None:
+        """
+        labels: slot_id -> (label, tooltip). Safe to call from any thread.
+        """
+        self._slot_labels_changed.emit(labels)
+
+
+    def add_side_panel(self, widget: QWidget, width: int = 260) -> None:
+        """
+        Adds a panel (the queue / history) on the right side.
+        """
+        widget.setFixedWidth(width)
+        self._outer_layout.addWidget(widget)
 
 
     def set_cover(self, pix: QPixmap) -> None:
@@ -88,6 +117,30 @@ class MainWindow(QMainWindow):
         super().resizeEvent(e)
 
 
+    def _apply_slot_labels(self, labels: dict) -> None:
+        for slot_id in list(self._slot_buttons):
+            if slot_id not in labels:
+                self._slot_buttons.pop(slot_id).deleteLater()
+
+        for slot_id, (label, tooltip) in sorted(labels.items()):
+            btn = self._slot_buttons.get(slot_id)
+            if btn is None:
+                btn = QPushButton()
+                btn.setFixedHeight(28)
+                btn.clicked.connect(lambda _=False, s=slot_id: self.action_requested.emit(ActionEvent(ActionKind.SLOT, s)))
+                self.slots_layout.addWidget(btn)
+                self._slot_buttons[slot_id] = btn
+            btn.setText(self.slot_text(slot_id, label))
+            btn.setToolTip(tooltip)
+
+
+    @staticmethod
+    def slot_text(slot_id: int, label: str, max_len: int = 10) -> str:
+        if len(label) > max_len:
+            label = label[:max_len - 1] + "…"
+        return f"{slot_id}: {label}"
+
+
     def _rescale_cover(self):
         if self._cover_pix.isNull():
             self.cover.clear()
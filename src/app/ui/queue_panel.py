@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import List, Optional
+
+from PySide6.QtCore import QSize, QTimer, Signal
+from PySide6.QtWidgets import QListView, QTabWidget, QVBoxLayout, QWidget
+
+from app.services.spotify_client import SpotifyService
+from app.ui.image_loader import ImageLoader
+from app.ui.track_list_model import TrackListModel, TrackRow
+
+log = logging.getLogger(__name__)
+
+
+class QueuePanel(QWidget):
+    """
+    Up next and recently played, as two tabs of virtualized list views.
+    Call refresh() when the track changes, not on every poll.
+    """
+
+    _queue_loaded = Signal(object)  # rows
+    _history_loaded = Signal(object, object, bool)  # rows, cursor of the next older page, first page?
+    _history_failed = Signal()
+
+    def __init__(
+        self,
+        spotify: SpotifyService,
+        image_loader: ImageLoader,
+        page_size: int = 50,
+        retry_ms: int = 5000,
+        parent: Optional[QWidget] = None,
+    ) -> None:
+        super().__init__(parent)
+        self._spotify = spotify
+        self._page_size = page_size
+        self._cursor: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._refresh_pending = False
+
+        self.queue_model = TrackListModel(image_loader, parent=self)
+        self.history_model = TrackListModel(image_loader, parent=self)
+        self.history_model.more_requested.connect(self._fetch_older_history)
+
+        tabs = QTabWidget()
+        tabs.addTab(self._make_view(self.queue_model), "Up next")
+        tabs.addTab(self._make_view(self.history_model), "History")
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(tabs)
+
+        self._queue_loaded.connect(self.queue_model.set_rows)
+        self._history_loaded.connect(self._apply_history)
+        # keep has_more, the view asks again once the fetch has ended, after a pause
+        self._history_failed.connect(lambda: QTimer.singleShot(retry_ms, self.history_model.end_fetch))
+
+
+    def refresh(self) -> None:
+        """
+        Reloads the queue and the newest history. Safe to call from any thread;
+        calls while a refresh runs are folded into one more refresh.
+        """
+        with self._lock:
+            if self._refreshing:
+                self._refresh_pending = True
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="queue-refresh", daemon=True).start()
+
+
+    @staticmethod
+    def _make_view(model: TrackListModel) -> QListView:
+        view = QListView()
+        view.setModel(model)
+        view.setUniformItemSizes(True)  # row heights are never measured row by row
+        view.setIconSize(QSize(40, 40))
+        view.setVerticalScrollMode(QListView.ScrollPerPixel)
+        view.setStyleSheet("color: white; background: transparent;")
+        return view
+
+
+    def _refresh(self) -> None:
+        while True:
+            try:
+                self._queue_loaded.emit([TrackRow.from_item(item) for item in self._spotify.get_queue()])
+            except Exception as e:
+                log.warning("Loading the queue failed: %s", e)
+            try:
+                items, cursor = self._spotify.get_recently_played(limit=self._page_size)
+                self._history_loaded.emit(self._history_rows(items), cursor, True)
+            except Exception as e:
+                log.warning("Loading the play history failed: %s", e)
+
+            with self._lock:
+                if not self._refresh_pending:
+                    self._refreshing = False
+                    return
+                self._refresh_pending = False
+
+
+    def _fetch_older_history(self) -> None:
+        cursor = self._cursor
+
+        def fetch():
+            try:
+                items, next_cursor = self._spotify.get_recently_played(before=cursor, limit=self._page_size)
+                self._history_loaded.emit(self._history_rows(items), next_cursor, False)
+            except Exception as e:
+                log.warning("Loading older play history failed: %s", e)
+                self._history_failed.emit()
+
+        threading.Thread(target=fetch, name="history-page", daemon=True).start()
+
+
+    def _apply_history(self, rows: List[TrackRow], cursor: Optional[str], first_page: bool) -> None:
+        model = self.history_model
+        if not first_page:
+            self._cursor = cursor
+            model.append_rows(rows, has_more=cursor is not None)
+            return
+
+        old = model.rows()
+        if not old:
+            self._cursor = cursor
+        elif rows:
+            # the newest page replaces the newest rows, older pages already loaded stay
+            rows = rows + [r for r in old if r.played_at < rows[-1].played_at]
+        else:
+            rows = old
+        model.set_rows(rows)
+        model.set_has_more(self._cursor is not None)
+
+
+    @staticmethod
+    def _history_rows(items: List[dict]) -> List[TrackRow]:
+        return [TrackRow.from_item(i["track"], played_at=i.get("played_at", "")) for i in items]
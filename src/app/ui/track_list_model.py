@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import List, Optional
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QObject, Qt, Signal
+from PySide6.QtGui import QPixmap
+
+from app.ui.image_loader import ImageLoader
+
+
+@dataclass(frozen=True)
+class TrackRow:
+    key: str  # identity when diffing, the uri, or uri@played_at in the history
+    uri: str
+    name: str
+    subtitle: str = ""  # artists / show
+    thumb_url: str = ""  # smallest image
+    played_at: float = 0.0  # unix time, history only
+
+    @staticmethod
+    def from_item(item: dict, played_at: str = "") -> "TrackRow":
+        """
+        Builds a row from a Spotify track or episode object. played_at is
+        the ISO timestamp of a history entry.
+        """
+        played = parse_played_at(played_at)
+        if item.get("type") == "episode":
+            subtitle = (item.get("show") or {}).get("name", "")
+            images = item.get("images") or []
+        else:
+            subtitle = ", ".join(a.get("name", "") for a in item.get("artists", []))
+            images = (item.get("album") or {}).get("images") or []
+        uri = item.get("uri", "")
+        return TrackRow(
+            key=f"{uri}@{played:.3f}" if played else uri,
+            uri=uri,
+            name=item.get("name", ""),
+            subtitle=subtitle,
+            thumb_url=images[-1]["url"] if images else "",
+            played_at=played,
+        )
+
+
+def parse_played_at(text: str) -> float:
+    """
+    Spotify's played_at ("2024-05-01T10:00:00.123Z") as unix time, 0 if
+    missing. The number of fractional digits varies, so never compare the
+    strings.
+    """
+    if not text:
+        return 0.0
+    text = text.strip().replace("Z", "+00:00")
+    head, dot, rest = text.partition(".")
+    if dot:
+        # fromisoformat on 3.10 only takes exactly 3 or 6 digits
+        digits = len(rest) - len(rest.lstrip("0123456789"))
+        text = f"{head}.{rest[:digits][:6].ljust(6, '0')}{rest[digits:]}"
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class TrackListModel(QAbstractListModel):
+    """
+    Up next / history rows. Thumbnails load when a row is first painted, set_rows() emits only the
+    changes, and older pages come in through fetchMore -> more_requested -> append_rows().
+    """
+
+    more_requested = Signal()
+
+    def __init__(
+        self,
+        image_loader: ImageLoader,
+        thumb_size: int = 40,
+        max_thumbs: int = 300,
+        parent: Optional[QObject] = None,
+    ) -> None:
+        super().__init__(parent)
+        self._rows: List[TrackRow] = []
+        self._thumb_size = thumb_size
+        self._max_thumbs = max_thumbs
+        self._thumbs: "OrderedDict[str, QPixmap]" = OrderedDict()  # url -> scaled, LRU
+        self._requested = set()
+        self._has_more = False
+        self._fetching = False
+
+        self._image_loader = image_loader
+        image_loader.loaded.connect(self._on_thumb_loaded)
+
+
+    def rows(self) -> List[TrackRow]:
+        return list(self._rows)
+
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{row.name}\n{row.subtitle}" if row.subtitle else row.name
+        if role == Qt.ToolTipRole:
+            return f"{row.name}  -  {row.subtitle}" if row.subtitle else row.name
+        if role == Qt.DecorationRole:
+            return self._thumb(row.thumb_url)
+        return None
+
+
+    def set_rows(self, rows: List[TrackRow]) -> None:
+        """
+        Replaces the rows, emitting only the changes.
+        """
+        old_keys = [r.key for r in self._rows]
+        new_keys = [r.key for r in rows]
+        opcodes = SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes()
+
+        # back to front, so the indices of the earlier opcodes stay valid
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            if tag == "equal":
+                for offset in range(i2 - i1):
+                    if self._rows[i1 + offset] != rows[j1 + offset]:
+                        self._rows[i1 + offset] = rows[j1 + offset]
+                        idx = self.index(i1 + offset)
+                        self.dataChanged.emit(idx, idx)
+                continue
+            if tag in ("delete", "replace"):
+                self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+                del self._rows[i1:i2]
+                self.endRemoveRows()
+            if tag in ("insert", "replace"):
+                self.beginInsertRows(QModelIndex(), i1, i1 + (j2 - j1) - 1)
+                self._rows[i1:i1] = rows[j1:j2]
+                self.endInsertRows()
+
+
+    def append_rows(self, rows: List[TrackRow], has_more: bool) -> None:
+        """
+        Adds a fetched page at the end and ends the fetch.
+        """
+        self._fetching = False
+        self._has_more = has_more
+        if rows:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+
+    def set_has_more(self, has_more: bool) -> None:
+        self._has_more = has_more
+
+
+    def end_fetch(self) -> None:
+        """
+        Ends a fetch that brought nothing (e.g. it failed), so the view can ask again.
+        """
+        self._fetching = False
+
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._has_more and not self._fetching
+
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if self.canFetchMore(parent):
+            self._fetching = True
+            self.more_requested.emit()
+
+
+    def _thumb(self, url: str) -> Optional[QPixmap]:
+        if not url:
+            return None
+        pix = self._thumbs.get(url)
+        if pix is not None:
+            self._thumbs.move_to_end(url)
+            return pix
+        if url not in self._requested:
+            self._requested.add(url)
+            self._image_loader.load(url)
+        return None
+
+
+    def _on_thumb_loaded(self, url: str, pix: QPixmap) -> None:
+        if url not in self._requested:
+            return  # the big cover or another model's thumbnail
+        self._requested.discard(url)
+
+        self._thumbs[url] = pix.scaled(self._thumb_size, self._thumb_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        while len(self._thumbs) > self._max_thumbs:
+            self._thumbs.popitem(last=False)  # comes back from the disk cache if shown again
+
+        for i, row in enumerate(self._rows):
+            if row.thumb_url == url:
+                idx = self.index(i)
+                self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from app.core.action_queue import OfflineActionQueue
+from app.core.actions import ActionEvent, ActionKind
+
+
+class Unavailable(Exception):
+    pass
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+def make_queue(tmp_path, **kwargs):
+    kwargs.setdefault("base_delay", 0.05)
+    kwargs.setdefault("max_delay", 0.2)
+    return OfflineActionQueue(path=tmp_path / "queue.jsonl", **kwargs)
+
+
+def test_slot_press_replaces_earlier_entries_of_same_account(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.push(ActionEvent(ActionKind.NEXT, account="bar"))
+    queue.push(ActionEvent(ActionKind.NEXT, account="terrace"))
+    queue.push(ActionEvent(ActionKind.SLOT, 1, account="bar"))
+    assert [(q.action.kind, q.action.account) for q in queue._items] == [
+        (ActionKind.NEXT, "terrace"),
+        (ActionKind.SLOT, "bar"),
+    ]
+
+
+def test_two_toggles_cancel(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.push(ActionEvent(ActionKind.PLAY_PAUSE))
+    queue.push(ActionEvent(ActionKind.PLAY_PAUSE))
+    assert queue.depth == 0
+
+
+def test_persisted_state_survives_restart(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.push(ActionEvent(ActionKind.SLOT, 2, account="bar"))
+    queue.push(ActionEvent(ActionKind.NEXT))
+    again = make_queue(tmp_path)
+    assert [q.action for q in again._items] == [q.action for q in queue._items]
+
+
+def test_offline_account_does_not_block_others(tmp_path):
+    queue = make_queue(tmp_path)
+    done = []
+
+    def replay(action):
+        if action.account == "bar":
+            raise Unavailable()
+        done.append(action)
+
+    queue.push(ActionEvent(ActionKind.NEXT, account="bar"))
+    queue.push(ActionEvent(ActionKind.SLOT, 1, account="terrace"))
+    queue.start(replay, lambda e: isinstance(e, Unavailable))
+    try:
+        assert wait_until(lambda: done)
+        assert done == [ActionEvent(ActionKind.SLOT, 1, account="terrace")]
+        assert queue.pending("bar") == 1 and queue.pending("terrace") == 0
+    finally:
+        queue.stop()
+
+
+def test_toggle_pressed_during_replay_is_not_collapsed_into_it(tmp_path):
+    queue = make_queue(tmp_path)
+    replaying = threading.Event()
+    release = threading.Event()
+    done = []
+
+    def replay(action):
+        if not done:
+            replaying.set()
+            release.wait(2)
+        done.append(action)
+
+    queue.push(ActionEvent(ActionKind.PLAY_PAUSE))
+    queue.start(replay, lambda e: False)
+    try:
+        assert replaying.wait(2)
+        queue.push(ActionEvent(ActionKind.PLAY_PAUSE))
+        release.set()
+        assert wait_until(lambda: len(done) == 2)
+        assert queue.depth == 0
+    finally:
+        queue.stop()
+
+
+def test_wake_during_replay_is_not_lost(tmp_path):
+    queue = make_queue(tmp_path, base_delay=30, max_delay=30)
+    attempts = []
+
+    def replay(action):
+        attempts.append(action)
+        if len(attempts) == 1:
+            queue.wake()  # e.g. a poll succeeded while this call was failing
+            raise Unavailable()
+
+    queue.push(ActionEvent(ActionKind.NEXT))
+    queue.start(replay, lambda e: isinstance(e, Unavailable))
+    try:
+        assert wait_until(lambda: len(attempts) == 2)
+    finally:
+        queue.stop()
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    queue = make_queue(tmp_path, max_age=10)
+    queue.push(ActionEvent(ActionKind.NEXT), queued_at=time.time() - 60)
+    done = []
+    queue.start(done.append, lambda e: False)
+    try:
+        assert wait_until(lambda: queue.depth == 0)
+        assert done == []
+    finally:
+        queue.stop()
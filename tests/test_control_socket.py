@@ -0,0 +1,26 @@
+import json
+import socket
+
+from app.input.control_socket import ControlSocketBackend
+
+
+def request(path, line):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(path)
+        sock.sendall(json.dumps(line).encode() + b"\n")
+        return json.loads(sock.makefile().readline())
+
+
+def test_stop_closes_the_wakeup_pair_and_start_works_again(tmp_path):
+    path = str(tmp_path / "control.sock")
+    backend = ControlSocketBackend(state_provider=lambda: {"playing": True}, path=path)
+
+    for _ in range(2):
+        backend.start(lambda action, source: None)
+        wakeup = (backend._wakeup_r, backend._wakeup_w)
+        assert request(path, {"op": "state"}) == {"ok": True, "state": {"playing": True}}
+        backend.stop()
+        assert all(sock.fileno() == -1 for sock in wakeup)
+
+    backend.publish("state", uri="")  # stopped, must not raise
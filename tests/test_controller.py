@@ -0,0 +1,79 @@
+from app.core.action_queue import OfflineActionQueue
+from app.core.actions import ActionEvent, ActionKind
+from app.core.controller import AppController, Binding
+from app.services.metadata_cache import MetadataCache
+from app.services.registry import SpotifyServiceRegistry
+
+
+class FakeService:
+    def __init__(self):
+        self.calls = []
+
+    def next_auto(self):
+        self.calls.append("next")
+
+    def play_playlist_auto(self, uri):
+        self.calls.append(uri)
+
+    def wait_logged_in(self, timeout=None):
+        return True
+
+    def list_devices(self):
+        return []
+
+    def close(self):
+        pass
+
+
+def make_controller(tmp_path):
+    accounts = SpotifyServiceRegistry()
+    for name in ("", "bar", "terrace"):
+        accounts.add(name, FakeService())
+    controller = AppController(
+        spotify_service=accounts.get(),
+        control_bindings={1: Binding(type="playlist", uri="spotify:playlist:x", account="terrace")},
+        set_status=lambda text: None,
+        set_error=lambda text: None,
+        set_cover_url=lambda url: None,
+        accounts=accounts,
+        action_queue=OfflineActionQueue(path=tmp_path / "queue.jsonl"),
+    )
+    return controller, accounts
+
+
+def test_backlog_of_one_account_does_not_queue_presses_for_another(tmp_path):
+    controller, accounts = make_controller(tmp_path)
+    controller.action_queue.push(ActionEvent(ActionKind.NEXT, account="bar"))
+    try:
+        controller.handle_action(ActionEvent(ActionKind.SLOT, 1), "test")
+        controller.handle_action(ActionEvent(ActionKind.NEXT, account="bar"), "test")
+    finally:
+        accounts.shutdown()
+
+    assert accounts.get("terrace").calls == ["spotify:playlist:x"]
+    assert accounts.get("bar").calls == []
+    assert controller.action_queue.pending("bar") == 2
+
+
+def test_warm_up_skips_slots_of_unknown_accounts(tmp_path, caplog):
+    accounts = SpotifyServiceRegistry()
+    accounts.add("", FakeService())
+    labels = []
+    controller = AppController(
+        spotify_service=accounts.get(),
+        control_bindings={1: Binding(type="playlist", uri="spotify:playlist:x", account="gone")},
+        set_status=lambda text: None,
+        set_error=lambda text: None,
+        set_cover_url=lambda url: None,
+        accounts=accounts,
+        metadata=MetadataCache(path=tmp_path / "metadata.sqlite"),
+        set_slot_labels=labels.append,
+    )
+    try:
+        controller._warm_metadata()
+    finally:
+        accounts.shutdown()
+        controller.metadata.close()
+
+    assert "unknown account 'gone'" in caplog.text
+    assert labels  # the other work still ran
@@ -0,0 +1,101 @@
+from app.services.library_index import PLAYLISTS, LibraryIndex, LibraryIndexer, LibraryItem
+
+
+def track(uri, name, artist="Artist"):
+    return LibraryItem(uri=uri, kind="track", name=name, subtitle=artist)
+
+
+def make_index(tmp_path):
+    return LibraryIndex(path=tmp_path / "library.sqlite")
+
+
+def test_prefix_matches_rank_before_fuzzy_and_respect_limit(tmp_path):
+    index = make_index(tmp_path)
+    index.add("a", [
+        track("t:1", "Hello World"),
+        track("t:2", "Hello"),
+        LibraryItem("p:1", "playlist", "Hello mix"),
+        track("t:3", "Yellow"),
+    ])
+
+    assert [i.uri for i in index.search("hel")] == ["p:1", "t:2", "t:1"]
+    assert [i.uri for i in index.search("hel", limit=2)] == ["p:1", "t:2"]
+    assert [i.uri for i in index.search("hel", kinds={"track"})] == ["t:2", "t:1"]
+    assert "t:3" in [i.uri for i in index.search("yelow")]
+
+
+def test_accents_and_rename(tmp_path):
+    index = make_index(tmp_path)
+    index.add("a", [track("t:1", "Halo", "Beyoncé")])
+    assert [i.uri for i in index.search("beyonce")] == ["t:1"]
+
+    index.add("a", [track("t:1", "Crazy in love", "Beyoncé")])
+    assert index.search("halo") == []
+    assert [i.uri for i in index.search("crazy")] == ["t:1"]
+
+
+def test_finish_drops_unseen_members_and_keeps_shared_items(tmp_path):
+    index = make_index(tmp_path)
+    index.add("a", [track("t:1", "One"), track("t:2", "Two")])
+    index.add("b", [track("t:2", "Two")])
+
+    index.finish("a", {"t:1"}, "v2")
+
+    assert index.version("a") == "v2"
+    assert index.get("t:2") is not None  # still in "b"
+    index.drop_source("b")
+    assert index.get("t:2") is None
+    assert index.search("two") == []
+
+
+def test_load_reads_back_persisted_items(tmp_path):
+    index = make_index(tmp_path)
+    index.replace("a", [track("t:1", "One")], "v1")
+    index.close()
+
+    index = make_index(tmp_path)
+    index.load()
+    assert index.version("a") == "v1"
+    assert [i.uri for i in index.search("one")] == ["t:1"]
+
+
+class FakeSpotify:
+    def __init__(self, playlists, tracks):
+        self.playlists = playlists
+        self.tracks = tracks
+
+    def iter_saved(self, kind):
+        return iter([])
+
+    def iter_user_playlists(self):
+        yield self.playlists
+
+    def iter_playlist_tracks(self, uri):
+        if isinstance(self.tracks[uri], Exception):
+            raise self.tracks[uri]
+        yield self.tracks[uri]
+
+
+def playlist(uri, name, snapshot):
+    return {"uri": uri, "type": "playlist", "name": name, "snapshot_id": snapshot}
+
+
+def raw_track(uri, name):
+    return {"uri": uri, "type": "track", "name": name, "artists": [{"name": "Artist"}]}
+
+
+def test_failing_playlist_does_not_stop_the_others(tmp_path):
+    index = make_index(tmp_path)
+    spotify = FakeSpotify(
+        [playlist("spotify:playlist:a", "A", "s1"), playlist("spotify:playlist:b", "B", "s1")],
+        {
+            "spotify:playlist:a": RuntimeError("502"),
+            "spotify:playlist:b": [raw_track("t:1", "Song")],
+        },
+    )
+    LibraryIndexer(spotify, index).sync()
+
+    assert index.version(PLAYLISTS) == "2"
+    assert index.version("spotify:playlist:a") is None  # retried next sync
+    assert index.version("spotify:playlist:b") == "s1"
+    assert [i.uri for i in index.search("song")] == ["t:1"]
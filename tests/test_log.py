@@ -0,0 +1,26 @@
+import logging
+import queue
+
+from app.config.log import _DroppingQueueHandler
+
+
+def test_dropped_records_are_reported_once_there_is_room():
+    q = queue.Queue(maxsize=1)
+    handler = _DroppingQueueHandler(q)
+    record = logging.makeLogRecord({"msg": "hello"})
+
+    handler.enqueue(record)
+    handler.enqueue(record)
+    handler.enqueue(record)
+    assert handler.dropped == 2
+
+    q.get_nowait()
+    q.maxsize = 10
+    handler.enqueue(record)
+    q.get_nowait()
+    report = q.get_nowait()
+    assert report.levelno == logging.WARNING
+    assert report.getMessage() == "2 log records dropped, the log queue was full (2 in total)"
+
+    handler.enqueue(record)
+    assert q.qsize() == 1  # reported once
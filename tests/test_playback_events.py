@@ -0,0 +1,69 @@
+from app.core.playback_events import (
+    DROP_NEWEST,
+    DeviceChanged,
+    PlaybackEventBus,
+    PlaybackSnapshot,
+    PlayStateChanged,
+    ProgressJumped,
+    TrackChanged,
+    diff_snapshots,
+)
+
+
+def snap(uri="spotify:track:a", playing=True, device="d1", progress=0, at=0.0):
+    return PlaybackSnapshot(track_uri=uri, track_name=uri[-1:], is_playing=playing,
+                            device_id=device, progress_ms=progress, taken_at=at)
+
+
+def kinds(events):
+    return [type(e) for e in events]
+
+
+def test_first_snapshot_reports_everything_it_has():
+    assert kinds(diff_snapshots(None, snap())) == [TrackChanged, PlayStateChanged, DeviceChanged]
+    assert diff_snapshots(None, PlaybackSnapshot()) == []
+
+
+def test_steady_playback_is_quiet_and_a_seek_is_a_jump():
+    prev = snap(progress=10_000, at=100.0)
+    assert diff_snapshots(prev, snap(progress=11_000, at=101.0)) == []
+
+    [jump] = diff_snapshots(prev, snap(progress=60_000, at=101.0))
+    assert isinstance(jump, ProgressJumped)
+    assert (jump.expected_ms, jump.actual_ms) == (11_000, 60_000)
+
+
+def test_paused_progress_does_not_advance():
+    prev = snap(playing=False, progress=10_000, at=100.0)
+    assert diff_snapshots(prev, snap(playing=False, progress=10_000, at=130.0)) == []
+
+
+def test_track_and_device_change():
+    events = diff_snapshots(snap(), snap(uri="spotify:track:b", device="d2"))
+    assert kinds(events) == [TrackChanged, DeviceChanged]
+    assert events[0].previous_uri == "spotify:track:a"
+    assert events[1].previous_device_id == "d1"
+
+
+def test_state_keeps_the_published_keys():
+    state = snap().to_state()
+    assert state["uri"] == "spotify:track:a"
+    assert state["name"] == "a"
+    assert {"artists", "cover_url"} <= set(state)
+    assert TrackChanged(snap()).to_dict()["state"]["uri"] == "spotify:track:a"
+
+
+def test_bus_filters_kinds_and_drops_when_full():
+    bus = PlaybackEventBus()
+    seen = []
+    bus.subscribe_callback(seen.append, kinds={TrackChanged})
+    sub = bus.subscribe(maxsize=1, policy=DROP_NEWEST)
+
+    bus.publish(snap())
+    bus.publish(snap(uri="spotify:track:b"))
+
+    assert kinds(seen) == [TrackChanged, TrackChanged]
+    assert isinstance(sub.get(timeout=0), TrackChanged)
+    assert sub.dropped == 3
+    sub.close()
+    assert sub.get(timeout=0) is None
@@ -0,0 +1,35 @@
+from app.core.controller import Binding
+from app.services.prewarm import SlotPrewarmer
+from app.services.registry import SpotifyServiceRegistry
+
+
+class FakeService:
+    def __init__(self):
+        self.calls = []
+
+    def ensure_fresh_token(self):
+        self.calls.append("token")
+
+    def refresh_device(self, min_ttl=0.0):
+        self.calls.append(("device", min_ttl))
+
+    def close(self):
+        pass
+
+
+def test_devices_are_refreshed_before_they_expire():
+    accounts = SpotifyServiceRegistry()
+    accounts.add("", FakeService())
+    accounts.add("bar", FakeService())
+    prewarmer = SlotPrewarmer(
+        accounts,
+        bindings=lambda: {1: Binding(type="playlist", uri="spotify:playlist:x", account="bar")},
+        device_interval=4.0,
+    )
+    try:
+        prewarmer.warm_accounts()
+    finally:
+        accounts.shutdown()
+
+    assert accounts.get("bar").calls == ["token", ("device", 4.0)]
+    assert accounts.get("").calls == []
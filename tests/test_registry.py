@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.registry import ALL_ACCOUNTS, AccountsError, SpotifyServiceRegistry
+
+
+class FakeService:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def ping(self):
+        if self.fail:
+            raise RuntimeError("offline")
+        return "pong"
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def accounts():
+    registry = SpotifyServiceRegistry()
+    yield registry
+    registry.shutdown()
+
+
+def test_empty_name_stays_default_when_more_accounts_are_added(accounts):
+    accounts.add("", FakeService())
+    accounts.add("bar", FakeService())
+
+    assert accounts.default == ""
+    assert accounts.resolve(None) == [""]
+
+
+def test_explicit_default_wins():
+    registry = SpotifyServiceRegistry(default="bar")
+    try:
+        registry.add("", FakeService())
+        registry.add("bar", FakeService())
+        assert registry.resolve(None) == ["bar"]
+    finally:
+        registry.shutdown()
+
+
+def test_fan_out_and_unknown_accounts(accounts):
+    accounts.add("", FakeService())
+    accounts.add("bar", FakeService())
+
+    assert accounts.resolve(ALL_ACCOUNTS) == ["", "bar"]
+    with pytest.raises(KeyError):
+        accounts.resolve("terrace")
+
+
+def test_fan_out_collects_every_error(accounts):
+    accounts.add("", FakeService())
+    accounts.add("bar", FakeService(fail=True))
+
+    with pytest.raises(AccountsError) as info:
+        accounts.run(ALL_ACCOUNTS, lambda svc: svc.ping())
+    assert list(info.value.errors) == ["bar"]
+    assert accounts.run("", lambda svc: svc.ping()) == {"": "pong"}
@@ -0,0 +1,52 @@
+import socket
+import threading
+
+import pytest
+
+from app.bootstrap import SCOPE
+from app.diagnostics.fake_api import FakeSpotify, make_server
+from app.services.spotify_client import SpotifyService
+
+
+@pytest.fixture
+def api():
+    server = make_server(FakeSpotify())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_finish_login_ends_a_waiting_redirect_login(api, tmp_path):
+    port = free_port()
+    service = SpotifyService(
+        client_id="test",
+        redirect_uri=f"http://127.0.0.1:{port}/callback",
+        scope=SCOPE,
+        api_prefix=f"{api}/v1/",
+        cache_dir=tmp_path,
+        token_url=f"{api}/api/token",
+    )
+    shown = threading.Event()
+    login = threading.Thread(
+        target=service.ensure_automatic_logging,
+        kwargs={"port": port, "on_login_url": lambda url: shown.set()},
+    )
+    login.start()
+    assert shown.wait(5)
+
+    # pasted from a browser on another machine, the redirect never reached this one
+    service.finish_login(f"http://127.0.0.1:{port}/callback?code=remote")
+
+    login.join(timeout=5)
+    assert not login.is_alive()
+    assert service.wait_logged_in(0)
+    assert (tmp_path / "spotify_token_cache").exists()
+    service.close()
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import QObject, Signal  # noqa: E402
+from PySide6.QtGui import QGuiApplication, QPixmap  # noqa: E402
+
+from app.ui.track_list_model import TrackListModel, TrackRow, parse_played_at  # noqa: E402
+
+
+class FakeImageLoader(QObject):
+    loaded = Signal(str, QPixmap)
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def load(self, url):
+        self.urls.append(url)
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QGuiApplication.instance() or QGuiApplication([])
+
+
+def row(key, name=None):
+    return TrackRow(key=key, uri=key, name=name or key, subtitle="", thumb_url=f"http://img/{key}", played_at=0.0)
+
+
+def record(model):
+    changes = []
+    model.rowsInserted.connect(lambda parent, first, last: changes.append(("insert", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: changes.append(("remove", first, last)))
+    model.dataChanged.connect(lambda top, bottom, roles: changes.append(("change", top.row(), bottom.row())))
+    return changes
+
+
+def test_set_rows_emits_only_the_changes(app):
+    model = TrackListModel(FakeImageLoader())
+    model.set_rows([row("a"), row("b"), row("c")])
+    changes = record(model)
+
+    # the queue moved on by one track, and one title changed
+    model.set_rows([row("b", "B!"), row("c"), row("d")])
+
+    assert [r.key for r in model.rows()] == ["b", "c", "d"]
+    # applied back to front, so each index is valid when it is emitted
+    assert changes == [("insert", 3, 3), ("change", 1, 1), ("remove", 0, 0)]
+
+
+def test_thumbnails_load_only_for_painted_rows(app):
+    loader = FakeImageLoader()
+    model = TrackListModel(loader)
+    model.set_rows([row(str(i)) for i in range(100)])
+
+    model.data(model.index(3), 1)  # Qt.DecorationRole
+    model.data(model.index(3), 1)
+    assert loader.urls == ["http://img/3"]
+
+
+def test_fetch_more_waits_for_the_page(app):
+    model = TrackListModel(FakeImageLoader())
+    requested = []
+    model.more_requested.connect(lambda: requested.append(1))
+    model.set_has_more(True)
+
+    model.fetchMore()
+    model.fetchMore()
+    assert requested == [1]
+    model.append_rows([row("x")], has_more=False)
+    assert not model.canFetchMore()
+
+
+@pytest.mark.parametrize("text", [
+    "2024-05-01T10:00:00Z",
+    "2024-05-01T10:00:00.1Z",
+    "2024-05-01T10:00:00.100Z",
+    "2024-05-01T10:00:00.1000000Z",
+])
+def test_played_at_with_any_number_of_fraction_digits(text):
+    expected = 1714557600.0 if "." not in text else 1714557600.1
+    assert parse_played_at(text) == pytest.approx(expected)
+
+
+def test_played_at_missing_or_broken():
+    assert parse_played_at("") == 0.0
+    assert parse_played_at("yesterday") == 0.0